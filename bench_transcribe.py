@@ -0,0 +1,244 @@
+"""Benchmark faster-whisper.py transcription across a matrix of settings.
+
+Every configuration runs in its own child process so the peak RSS and the
+model load time of one run never leak into the next. Results are written as
+JSON for regression tracking:
+
+    python bench_transcribe.py --models small,large-v3 --compute-types int8,float16 \
+        --beam-sizes 1,5 --modes sequential,batched --vad on,off --output bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import ctranslate2
+import faster_whisper
+import numpy as np
+
+_ROOT = Path(__file__).resolve().parent
+_FIXTURE_DIR = _ROOT / "cache" / "bench"
+_SAMPLING_RATE = 16000
+
+
+def _load_transcriber():
+    # faster-whisper.py 的文件名带连字符，只能按路径加载
+    spec = importlib.util.spec_from_file_location("faster_whisper_cli", _ROOT / "faster-whisper.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _synthetic_fixture(seconds: int, seed: int = 0) -> Path:
+    """
+    Write (once) a deterministic WAV of voiced-like bursts separated by silences.
+    It exercises decoding and VAD splitting but is not speech; pass real recordings
+    with --audio for representative numbers.
+    """
+    path = _FIXTURE_DIR / f"synthetic_{seconds}s_seed{seed}.wav"
+    if path.exists():
+        return path
+    rng = np.random.default_rng(seed)
+    audio = np.zeros(seconds * _SAMPLING_RATE, dtype=np.float32)
+    pos = 0
+    while pos < audio.shape[0]:
+        pos += int(rng.uniform(0.5, 2.5) * _SAMPLING_RATE)
+        length = min(int(rng.uniform(1.5, 6.0) * _SAMPLING_RATE), audio.shape[0] - pos)
+        if length <= 0:
+            break
+        t = np.arange(length) / _SAMPLING_RATE
+        pitch = rng.uniform(110, 220) * (1 + 0.1 * np.sin(2 * np.pi * 0.7 * t))
+        phase = 2 * np.pi * np.cumsum(pitch) / _SAMPLING_RATE
+        burst = sum(np.sin(k * phase) / k for k in range(1, 6))
+        envelope = 0.5 * (1 + np.sin(2 * np.pi * rng.uniform(3, 5) * t))
+        audio[pos:pos + length] = 0.2 * burst * envelope + 0.01 * rng.standard_normal(length)
+        pos += length
+
+    _FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with wave.open(str(tmp_path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(_SAMPLING_RATE)
+        f.writeframes((np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+def _peak_rss_bytes() -> int | None:
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        peak = getattr(psutil.Process().memory_info(), "peak_wset", None)  # 仅 Windows 提供
+        if peak:
+            return int(peak)
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位是 KiB，macOS 是字节
+    return int(usage if sys.platform == "darwin" else usage * 1024)
+
+
+def _run_one(config: dict) -> dict:
+    fw = _load_transcriber()
+    device, compute_type = fw._resolve_backend(config["device"], config["compute_type"])
+    cpu_threads = config["cpu_threads"] or ((os.cpu_count() or 1) if device == "cpu" else 0)
+
+    started = time.perf_counter()
+    model = fw._create_model(config["model"], device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+    load_seconds = time.perf_counter() - started
+    # 解码不计入转写时间
+    audio = fw.decode_audio(config["audio"], sampling_rate=fw._SAMPLING_RATE)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = fw._transcribe_to_srt(
+            model=model,
+            input_path=config["audio"],
+            output_path=os.path.join(tmp, "bench.srt"),
+            language=config["language"],
+            beam_size=config["beam_size"],
+            vad_filter=config["vad"],
+            vad_threshold=config["vad_threshold"],
+            batched=config["mode"] == "batched",
+            batch_size=config["batch_size"],
+            log_progress=False,
+            audio=audio,
+        )
+
+    peak = _peak_rss_bytes()
+    return {
+        **config,
+        "device": device,
+        "compute_type": compute_type,
+        "cpu_threads": cpu_threads,
+        "load_seconds": round(load_seconds, 3),
+        "audio_seconds": round(stats["audio_seconds"], 3),
+        "wall_seconds": round(stats["wall_seconds"], 3),
+        "rtf": round(stats["rtf"], 4),
+        "segments": int(stats["segments"]),
+        "peak_rss_mb": round(peak / (1024 * 1024), 1) if peak is not None else None,
+    }
+
+
+def _run_child(config: dict, timeout: float) -> dict:
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--run-one", json.dumps(config)]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", timeout=timeout or None)
+    except subprocess.TimeoutExpired:
+        return {**config, "error": f"timed out after {timeout:.0f}s"}
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        tail = (proc.stderr or proc.stdout).strip().splitlines()[-1:] or [f"exit code {proc.returncode}"]
+        return {**config, "error": tail[0]}
+    return json.loads(lines[-1])
+
+
+def _csv(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark faster-whisper.py across a settings matrix.")
+    parser.add_argument("--audio", action="append", default=[], help="Audio/video fixture (repeatable).")
+    parser.add_argument(
+        "--fixture-seconds",
+        type=int,
+        default=300,
+        help="Length of the generated synthetic fixture used when no --audio is given.",
+    )
+    parser.add_argument("--models", default="large-v3", help="Comma-separated model names.")
+    parser.add_argument("--device", default="auto", help="Device for every run.")
+    parser.add_argument("--compute-types", default="auto", help="Comma-separated compute types.")
+    parser.add_argument("--beam-sizes", default="5", help="Comma-separated beam sizes.")
+    parser.add_argument("--modes", default="sequential,batched", help="Any of sequential,batched.")
+    parser.add_argument("--vad", default="on,off", help="Any of on,off.")
+    parser.add_argument("--batch-size", type=int, default=8, help="Batch size for batched runs.")
+    parser.add_argument("--vad-threshold", type=float, default=0.6, help="VAD threshold.")
+    parser.add_argument("--language", default="ja", help="Language code.")
+    parser.add_argument("--cpu-threads", type=int, default=0, help="CPU threads (0 = all cores on CPU).")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per configuration.")
+    parser.add_argument("--timeout", type=float, default=0, help="Seconds before a run is abandoned (0 = none).")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv: list[str]) -> int:
+    args = _build_arg_parser().parse_args(argv)
+    if args.run_one:
+        print(json.dumps(_run_one(json.loads(args.run_one))), flush=True)
+        return 0
+
+    fixtures = [os.path.abspath(path) for path in args.audio] or [str(_synthetic_fixture(args.fixture_seconds))]
+    matrix = itertools.product(
+        fixtures,
+        _csv(args.models),
+        _csv(args.compute_types),
+        [int(size) for size in _csv(args.beam_sizes)],
+        _csv(args.modes),
+        [value == "on" for value in _csv(args.vad)],
+        range(max(1, args.repeat)),
+    )
+
+    results = []
+    for audio, model, compute_type, beam_size, mode, vad, run in matrix:
+        config = {
+            "audio": audio,
+            "model": model,
+            "device": args.device,
+            "compute_type": compute_type,
+            "beam_size": beam_size,
+            "mode": mode,
+            "batch_size": args.batch_size,
+            "vad": vad,
+            "vad_threshold": args.vad_threshold,
+            "language": args.language,
+            "cpu_threads": args.cpu_threads,
+            "run": run,
+        }
+        row = _run_child(config, args.timeout)
+        results.append(row)
+        label = f"{Path(audio).name} {model} {row['compute_type']} beam {beam_size} {mode} vad {'on' if vad else 'off'}"
+        if "error" in row:
+            print(f"{label}: failed ({row['error']})", file=sys.stderr, flush=True)
+        else:
+            print(
+                f"{label}: rtf {row['rtf']:.3f}, wall {row['wall_seconds']:.1f}s, peak rss {row['peak_rss_mb']} MiB",
+                file=sys.stderr,
+                flush=True,
+            )
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "faster_whisper": faster_whisper.__version__,
+        "ctranslate2": ctranslate2.__version__,
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 1 if any("error" in row for row in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
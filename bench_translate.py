@@ -0,0 +1,452 @@
+"""Benchmark translate.py against a local stand-in for the LM Studio endpoint.
+
+A mock `/v1/chat/completions` server answers with "译:" + the source text under
+the same line tags. Its latency, output token rate and concurrency limit are
+configurable, it can inject malformed tags, it answers `stream: true`
+requests with server-sent events, and it models `cache_prompt` prefix reuse
+(reporting llama.cpp-style `timings`). `translate_file` then runs over
+synthetic SRTs of several sizes. Results are written as JSON:
+
+    python bench_translate.py --sizes 100,1000,20000 --concurrency 1,4 \
+        --latency 0.3 --token-rate 400 --server-slots 4 --malformed-rate 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+from pathlib import Path
+import platform
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import translate
+
+# 合成字幕用的短句，随机拼接成一行
+_PHRASES = [
+    "ちょっと待って", "本当にいいの", "こっちに来て", "大丈夫だよ", "何してるの",
+    "気持ちいい", "もう一回", "恥ずかしい", "見ないで", "ありがとう",
+    "今日は疲れた", "先生", "どうしよう", "すごいね", "早く",
+    "ごめんなさい", "そこはだめ", "また明日", "お願いします", "いいよ",
+]
+_SKIP_LINES = ["（笑）", "♪～", "[音楽]", "(拍手)"]
+
+_STATUS_RE = re.compile(r"^\[FALLBACK\] batches=(\d+) requests=(\d+)")
+_PROMPT_RE = re.compile(r"^\[PROMPT\] .*?cached=(\d+) .*?saved_ms=(\d+)")
+
+
+class MockChatServer:
+    """Threaded HTTP server imitating LM Studio's chat completions endpoint."""
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        jitter: float = 0.0,
+        token_rate: float = 0.0,
+        slots: int = 0,
+        malformed_rate: float = 0.0,
+        seed: int = 0,
+        prompt_rate: float = 0.0,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.token_rate = token_rate
+        self.prompt_rate = prompt_rate
+        # 模拟 llama.cpp 的 cache_prompt：见过的 system 前缀不再重新计算
+        self._cached_prefixes: set = set()
+        self.malformed_rate = malformed_rate
+        # 模拟服务端并行上限：超出的请求排队等待，和 LM Studio 一样
+        self._slots = threading.BoundedSemaphore(slots) if slots > 0 else None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._active = 0
+        self.stats: Dict[str, int] = {}
+        self.reset_stats()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {
+                "requests": 0,
+                "batch_requests": 0,
+                "line_requests": 0,
+                "stream_requests": 0,
+                "aborted_streams": 0,
+                "malformed_lines": 0,
+                "peak_concurrency": 0,
+            }
+            self._cached_prefixes = set()
+
+    def __enter__(self) -> "MockChatServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _corrupt(self, tagged: List[str]) -> List[str]:
+        out: List[str] = []
+        for i, line in enumerate(tagged):
+            with self._lock:
+                broken = self._random.random() < self.malformed_rate
+                kind = self._random.choice(("drop", "untag", "out_of_range", "duplicate"))
+                if broken:
+                    self.stats["malformed_lines"] += 1
+            if not broken:
+                out.append(line)
+            elif kind == "untag":
+                out.append(translate.LINE_TAG_RE.sub(r"\2", line))
+            elif kind == "out_of_range":
+                out.append(f"{translate.LINE_TAG_FMT.format(len(tagged) + i + 1)} {line}")
+            elif kind == "duplicate" and out:
+                out.append(out[-1])
+            # drop：什么都不输出
+        return out
+
+    def _generate(self, payload: dict) -> str:
+        messages = payload.get("messages") or []
+        system = messages[0]["content"] if messages else ""
+        user = messages[-1]["content"] if messages else ""
+        batched = system == translate.SYSTEM_PROMPT_BATCH
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["batch_requests" if batched else "line_requests"] += 1
+            if payload.get("stream"):
+                self.stats["stream_requests"] += 1
+
+        if not batched:
+            return "译:" + user
+        tagged = []
+        for raw in user.splitlines():
+            match = translate.LINE_TAG_RE.match(raw.strip())
+            if match:
+                tagged.append(f"{translate.LINE_TAG_FMT.format(match.group(1))} 译:{match.group(2)}")
+        return "\n".join(self._corrupt(tagged) if self.malformed_rate else tagged)
+
+    def _prompt_usage(self, payload: dict) -> dict:
+        """Token accounting for the prompt, with the system prefix reused when cache_prompt is set."""
+        messages = payload.get("messages") or []
+        total = sum(translate.estimate_tokens(m.get("content", "")) for m in messages)
+        system = messages[0].get("content", "") if messages else ""
+        cached = 0
+        if payload.get("cache_prompt"):
+            with self._lock:
+                if system in self._cached_prefixes:
+                    cached = translate.estimate_tokens(system)
+                self._cached_prefixes.add(system)
+        processed = total - cached
+        prompt_ms = processed / self.prompt_rate * 1000 if self.prompt_rate > 0 else 0.0
+        return {"prompt_tokens": total, "prompt_n": processed, "cache_n": cached, "prompt_ms": prompt_ms}
+
+    def _first_token_delay(self) -> float:
+        with self._lock:
+            return self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def _generation_delay(self, text: str) -> float:
+        if self.token_rate <= 0:
+            return 0.0
+        return sum(translate.estimate_tokens(line) for line in text.splitlines()) / self.token_rate
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def handle(self) -> None:
+                # 客户端提前断开流后会直接重置连接，不算错误
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._send(400, {"error": "invalid JSON"})
+                    return
+                if not self.path.rstrip("/").endswith("/v1/chat/completions"):
+                    self._send(404, {"error": "not found"})
+                    return
+
+                if server._slots:
+                    server._slots.acquire()
+                try:
+                    with server._lock:
+                        server._active += 1
+                        server.stats["peak_concurrency"] = max(server.stats["peak_concurrency"], server._active)
+                    content = server._generate(payload)
+                    prompt = server._prompt_usage(payload)
+                    time.sleep(server._first_token_delay() + prompt["prompt_ms"] / 1000)
+                    if payload.get("stream"):
+                        self._stream(payload, content, prompt)
+                    else:
+                        time.sleep(server._generation_delay(content))
+                        self._send(200, self._completion(payload, content, prompt))
+                finally:
+                    with server._lock:
+                        server._active -= 1
+                    if server._slots:
+                        server._slots.release()
+
+            def _usage(self, content: str, prompt: dict) -> dict:
+                completion_tokens = sum(translate.estimate_tokens(line) for line in content.splitlines())
+                return {
+                    "usage": {
+                        "prompt_tokens": prompt["prompt_tokens"],
+                        "completion_tokens": completion_tokens,
+                        "prompt_tokens_details": {"cached_tokens": prompt["cache_n"]},
+                    },
+                    # llama.cpp 风格的计时字段
+                    "timings": {
+                        "prompt_n": prompt["prompt_n"],
+                        "prompt_ms": prompt["prompt_ms"],
+                        "cache_n": prompt["cache_n"],
+                        "predicted_n": completion_tokens,
+                    },
+                }
+
+            def _completion(self, payload: dict, content: str, prompt: dict) -> dict:
+                return {
+                    "object": "chat.completion",
+                    "model": payload.get("model", "mock"),
+                    "choices": [
+                        {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                    ],
+                    **self._usage(content, prompt),
+                }
+
+            def _stream(self, payload: dict, content: str, prompt: dict) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                # 按行生成；客户端提前断开时停止“生成”，占用的并行槽随之释放
+                try:
+                    for line in content.splitlines(keepends=True):
+                        time.sleep(server._generation_delay(line))
+                        self._chunk({"choices": [{"index": 0, "delta": {"content": line}}]})
+                    self._chunk({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                    if (payload.get("stream_options") or {}).get("include_usage"):
+                        self._chunk({"choices": [], **self._usage(content, prompt)})
+                    self._write_chunk(b"data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    with server._lock:
+                        server.stats["aborted_streams"] += 1
+                    self.close_connection = True
+
+            def _chunk(self, event: dict) -> None:
+                self._write_chunk(b"data: " + json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n\n")
+
+            def _write_chunk(self, data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _send(self, status: int, body: dict) -> None:
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def write_synthetic_srt(path: str, lines: int, seed: int = 0, dup_rate: float = 0.2, skip_rate: float = 0.03) -> int:
+    """
+    Write an SRT with `lines` one-line entries in faster-whisper.py's timestamp format.
+    Some lines repeat earlier ones and some are sound-effect lines translate.py skips.
+    Returns the number of lines that need translating.
+    """
+    rng = random.Random(seed)
+    seen: List[str] = []
+    translatable = 0
+    with open(path, "w", encoding="utf-8") as handle:
+        for i in range(1, lines + 1):
+            roll = rng.random()
+            if roll < skip_rate:
+                text = rng.choice(_SKIP_LINES)
+            else:
+                if seen and roll < skip_rate + dup_rate:
+                    text = rng.choice(seen)
+                else:
+                    text = "、".join(rng.sample(_PHRASES, rng.randint(1, 3))) + f"（{i}）"
+                    seen.append(text)
+                translatable += 1
+            start = (i - 1) * 2.0
+            handle.write(f"{i}\n{start:.2f} --> {start + 1.5:.2f}\n{text}\n\n")
+    return translatable
+
+
+def run_once(
+    server: MockChatServer,
+    lines: int,
+    concurrency: int,
+    stream: bool,
+    prompt_cache: bool,
+    seed: int,
+    dup_rate: float,
+) -> dict:
+    server.reset_stats()
+    translate.STREAM_ENABLED = stream
+    translate.PROMPT_CACHE_ENABLED = prompt_cache
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"bench_{lines}.srt")
+        translatable = write_synthetic_srt(path, lines, seed=seed, dup_rate=dup_rate)
+        status = io.StringIO()
+        started = time.perf_counter()
+        # 状态行（[PROGRESS] 等）收进缓冲区，只解析统计信息
+        with contextlib.redirect_stdout(status):
+            translate.translate_file(path, concurrency=concurrency)
+        wall = time.perf_counter() - started
+
+    fallback_batches = fallback_requests = cached_tokens = saved_ms = 0
+    for line in status.getvalue().splitlines():
+        match = _STATUS_RE.match(line)
+        if match:
+            fallback_batches, fallback_requests = int(match.group(1)), int(match.group(2))
+        match = _PROMPT_RE.match(line)
+        if match:
+            cached_tokens, saved_ms = int(match.group(1)), int(match.group(2))
+
+    stats = dict(server.stats)
+    return {
+        "lines": lines,
+        "translatable_lines": translatable,
+        "concurrency": concurrency,
+        "stream": stream,
+        "prompt_cache": prompt_cache,
+        "wall_seconds": round(wall, 3),
+        "lines_per_second": round(translatable / wall, 2) if wall > 0 else 0.0,
+        "requests": stats["requests"],
+        "batch_requests": stats["batch_requests"],
+        "line_requests": stats["line_requests"],
+        "fallback_batches": fallback_batches,
+        "fallback_requests": fallback_requests,
+        "fallback_rate": round(fallback_requests / stats["requests"], 4) if stats["requests"] else 0.0,
+        "aborted_streams": stats["aborted_streams"],
+        "malformed_lines": stats["malformed_lines"],
+        "peak_server_concurrency": stats["peak_concurrency"],
+        "cached_prompt_tokens": cached_tokens,
+        "prompt_ms_saved": saved_ms,
+    }
+
+
+def _csv_ints(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def _csv_modes(value: str) -> List[bool]:
+    return [item.strip() == "on" for item in value.split(",") if item.strip()]
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark translate.py against a local mock chat endpoint.")
+    parser.add_argument("--sizes", default="100,1000,5000,20000", help="Comma-separated subtitle line counts.")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated in-flight batch limits.")
+    parser.add_argument("--stream", default="on", help="Comma-separated streaming modes to run: on, off.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first output token.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random seconds per response (uniform).")
+    parser.add_argument("--prompt-cache", default="on", help="Comma-separated prompt-cache modes to run: on, off.")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="Output tokens per second (0 = instant).")
+    parser.add_argument("--prompt-rate", type=float, default=0.0, help="Prompt tokens processed per second (0 = instant).")
+    parser.add_argument("--server-slots", type=int, default=0, help="Requests the mock serves at once (0 = no limit).")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Probability a tagged output line is broken.")
+    parser.add_argument("--dup-rate", type=float, default=0.2, help="Fraction of repeated lines in the synthetic SRT.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the SRT and the mock's randomness.")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_arg_parser().parse_args(argv)
+
+    # 基准只测模型调用路径：关闭翻译记忆和断点文件，避免命中缓存
+    translate.TM_ENABLED = False
+    translate.CHECKPOINT_ENABLED = False
+
+    results = []
+    with MockChatServer(
+        latency=args.latency,
+        jitter=args.jitter,
+        token_rate=args.token_rate,
+        slots=args.server_slots,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+        prompt_rate=args.prompt_rate,
+    ) as server:
+        translate.API_BASE = server.url
+        matrix = itertools.product(
+            _csv_ints(args.sizes),
+            _csv_ints(args.concurrency),
+            _csv_modes(args.stream),
+            _csv_modes(args.prompt_cache),
+        )
+        for lines, concurrency, stream, prompt_cache in matrix:
+            row = run_once(server, lines, concurrency, stream, prompt_cache, args.seed, args.dup_rate)
+            results.append(row)
+            print(
+                f"{lines} lines, concurrency {concurrency}, stream {'on' if stream else 'off'}, "
+                f"prompt cache {'on' if prompt_cache else 'off'}: {row['lines_per_second']} lines/s, "
+                f"prompt saved {row['prompt_ms_saved']}ms, "
+                f"{row['requests']} requests, fallback {row['fallback_rate']:.1%}, wall {row['wall_seconds']}s",
+                file=sys.stderr,
+                flush=True,
+            )
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "mock": {
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "token_rate": args.token_rate,
+            "prompt_rate": args.prompt_rate,
+            "server_slots": args.server_slots,
+            "malformed_rate": args.malformed_rate,
+        },
+        "settings": {
+            "batch_size": translate.BATCH_SIZE,
+            "adaptive_batching": translate.ADAPTIVE_BATCHING,
+            "max_retries": translate.MAX_RETRIES,
+            "stream_abort_after": translate.STREAM_ABORT_AFTER,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,9 +1,23 @@
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+import dataclasses
+import hashlib
+import json
 import os
 from pathlib import Path
+import queue
+import re
 import sys
+import threading
+import time
+from typing import Iterable
 
-from faster_whisper import WhisperModel
+import av
+import ctranslate2
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
+from faster_whisper.transcribe import restore_speech_timestamps
+from faster_whisper.vad import VadOptions, collect_chunks, get_speech_timestamps
+import numpy as np
 
 _BASE_DIR = Path(__file__).resolve().parent
 _CUDNN_DIR = _BASE_DIR / "lib" / "cudnn"
@@ -13,9 +27,508 @@ if _CUDNN_DIR.is_dir():
 if _CUDA_DIR.is_dir():
     os.add_dll_directory(str(_CUDA_DIR))
 
+_SAMPLING_RATE = 16000
 
-def _create_model(model_name: str, device: str, compute_type: str) -> WhisperModel:
-    return WhisperModel(model_name, device=device, compute_type=compute_type)
+# auto 模式下按顺序挑选第一个后端支持的计算类型
+_COMPUTE_TYPE_PREFERENCE = {
+    "cuda": ("float16", "int8_float16", "bfloat16", "float32"),
+    "cpu": ("int8", "int8_float32", "float32"),
+}
+# 预热用的静音长度（秒）；Whisper 总是按 30 秒窗口编码
+_WARMUP_SECONDS = 10
+
+# 部分结果落盘频率：每 N 段或每 T 秒 fsync 一次
+_SYNC_EVERY_SEGMENTS = 20
+_SYNC_EVERY_SECONDS = 5.0
+
+# 部分 SRT 中一个完整的字幕块：序号、时间行、文本、空行
+_SRT_BLOCK_RE = re.compile(rb"(\d+)\r?\n(\d+(?:\.\d+)?) --> (\d+(?:\.\d+)?)\r?\n[^\r\n]*\r?\n\r?\n")
+
+
+_print_lock = threading.Lock()
+
+
+def _emit(text: str) -> None:
+    # 多个 worker 同时输出时保证整行写出，控制器按行解析
+    with _print_lock:
+        print(text, flush=True)
+
+
+def _create_model(
+    model_name: str,
+    device: str,
+    compute_type: str,
+    cpu_threads: int = 0,
+    num_workers: int = 1,
+) -> WhisperModel:
+    return WhisperModel(
+        model_name,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=cpu_threads,
+        num_workers=num_workers,
+    )
+
+
+def _cuda_problem() -> str | None:
+    """Return why CUDA cannot be used here, or None when it can."""
+    try:
+        if ctranslate2.get_cuda_device_count() == 0:
+            return "no CUDA device found"
+        ctranslate2.get_supported_compute_types("cuda")
+    except Exception as exc:
+        # 驱动版本过低等情况下 CTranslate2 直接抛 RuntimeError
+        return str(exc)
+    return None
+
+
+def _resolve_backend(device: str, compute_type: str) -> tuple[str, str]:
+    """
+    Replace `auto` device/compute type with the best one this machine supports.
+    When CUDA is requested but cannot be used, fall back to CPU (int8 unless the
+    requested compute type also works there).
+    """
+    if device == "auto":
+        device = "cpu" if _cuda_problem() else "cuda"
+    elif device == "cuda":
+        problem = _cuda_problem()
+        if problem:
+            _emit(f"CUDA unavailable ({problem}); falling back to cpu")
+            device = "cpu"
+            if compute_type not in ctranslate2.get_supported_compute_types(device):
+                compute_type = "auto"
+    if compute_type == "auto":
+        supported = ctranslate2.get_supported_compute_types(device)
+        compute_type = next(
+            (name for name in _COMPUTE_TYPE_PREFERENCE.get(device, ()) if name in supported),
+            "default",
+        )
+    return device, compute_type
+
+
+def _warm_up(model: WhisperModel, language: str) -> float:
+    """Run one short transcription so lazy initialisation happens now; returns seconds of audio per second."""
+    audio = np.zeros(_WARMUP_SECONDS * _SAMPLING_RATE, dtype=np.float32)
+    started = time.perf_counter()
+    segments, _info = model.transcribe(audio, language=language, beam_size=1, vad_filter=False)
+    for _segment in segments:
+        pass
+    wall = time.perf_counter() - started
+    return _WARMUP_SECONDS / wall if wall > 0 else 0.0
+
+
+def _media_duration(path: str) -> float:
+    try:
+        with av.open(path) as container:
+            if container.duration:
+                return container.duration / av.time_base
+    except Exception:
+        pass
+    return 0.0
+
+
+class _AudioCache:
+    """
+    Decoded 16 kHz PCM per input, stored as .npy and loaded memory-mapped (zero copy).
+    Entries are keyed by absolute path + size + mtime, so an edited file is decoded again;
+    the least recently used entries are removed once the directory exceeds `max_bytes`.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def _entry_path(self, input_path: str) -> Path:
+        stat = os.stat(input_path)
+        raw = f"{os.path.abspath(input_path)}|{stat.st_size}|{stat.st_mtime_ns}|{_SAMPLING_RATE}"
+        return self.directory / f"{hashlib.sha1(raw.encode('utf-8')).hexdigest()}.npy"
+
+    def load(self, input_path: str) -> np.ndarray | None:
+        try:
+            entry = self._entry_path(input_path)
+            audio = np.load(entry, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        try:
+            # 以 mtime 作为最近使用时间
+            os.utime(entry)
+        except OSError:
+            pass
+        return audio
+
+    def store(self, input_path: str, audio: np.ndarray) -> None:
+        try:
+            entry = self._entry_path(input_path)
+        except OSError:
+            return
+        tmp_path = entry.with_name(f"{entry.name}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.ascontiguousarray(audio, dtype=np.float32))
+            os.replace(tmp_path, entry)
+        except OSError:
+            # 写满磁盘或目标仍被其他 worker 映射（Windows）时，别把几百 MB 的临时文件留在缓存目录里
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in self.directory.glob("*.npy"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry))
+                total += stat.st_size
+            entries.sort()
+            for _mtime, size, entry in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    entry.unlink()
+                except OSError:
+                    # Windows 下仍被映射的文件删不掉，下次再试
+                    continue
+                total -= size
+
+
+def _load_audio(input_path: str, cache: _AudioCache | None) -> np.ndarray:
+    if cache is not None:
+        audio = cache.load(input_path)
+        if audio is not None:
+            return audio
+    audio = decode_audio(input_path, sampling_rate=_SAMPLING_RATE)
+    if cache is not None:
+        cache.store(input_path, audio)
+        cached = cache.load(input_path)
+        if cached is not None:
+            return cached
+    return audio
+
+
+class _AudioPrefetcher:
+    """
+    Decode upcoming inputs to 16 kHz mono float32 on a background thread so that
+    decoding file N+1 overlaps inference of file N. Decoded audio waiting to be
+    taken is kept under `budget_bytes` (one file is always let through).
+    With `open_ended`, more paths can be queued with `add` until `close`.
+    """
+
+    def __init__(
+        self,
+        paths: list[str],
+        budget_bytes: int,
+        cache: _AudioCache | None = None,
+        open_ended: bool = False,
+    ) -> None:
+        self._paths = list(paths)
+        self._budget = budget_bytes
+        self._cache = cache
+        self._open_ended = open_ended
+        self._ready: dict[int, np.ndarray | None] = {}
+        self._used = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="audio-prefetch", daemon=True)
+        self._thread.start()
+
+    def add(self, path: str) -> int:
+        """Queue one more input (open-ended mode); returns the index to `take` it by."""
+        with self._cond:
+            self._paths.append(path)
+            self._cond.notify_all()
+            return len(self._paths) - 1
+
+    def _run(self) -> None:
+        index = 0
+        while True:
+            with self._cond:
+                while self._open_ended and not self._closed and index >= len(self._paths):
+                    self._cond.wait()
+                if self._closed or index >= len(self._paths):
+                    return
+                path = self._paths[index]
+            estimate = int(_media_duration(path) * _SAMPLING_RATE) * 4
+            with self._cond:
+                while not self._closed and self._ready and self._used + estimate > self._budget:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            try:
+                audio = _load_audio(path, self._cache)
+            except Exception:
+                # 解码失败交给 transcribe 重新处理并报告真正的错误
+                audio = None
+            with self._cond:
+                self._ready[index] = audio
+                self._used += audio.nbytes if audio is not None else 0
+                self._cond.notify_all()
+            index += 1
+
+    def take(self, index: int) -> np.ndarray | None:
+        """Block until input `index` is decoded and hand it over (None if decoding failed)."""
+        with self._cond:
+            while index not in self._ready and not self._closed:
+                self._cond.wait()
+            audio = self._ready.pop(index, None)
+            self._used -= audio.nbytes if audio is not None else 0
+            self._cond.notify_all()
+            return audio
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._ready.clear()
+            self._used = 0
+            self._cond.notify_all()
+
+
+class _VadCache:
+    """
+    Speech segments (VAD output, in samples) per input and VAD parameter set, as JSON.
+    They depend only on the audio and the VAD options, so re-transcribing with another
+    model or beam size can skip the VAD pass entirely.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def _entry_path(self, input_path: str, options: VadOptions) -> Path:
+        stat = os.stat(input_path)
+        params = json.dumps(dataclasses.asdict(options), sort_keys=True)
+        raw = f"{os.path.abspath(input_path)}|{stat.st_size}|{stat.st_mtime_ns}|{_SAMPLING_RATE}|{params}"
+        return self.directory / f"{hashlib.sha1(raw.encode('utf-8')).hexdigest()}.json"
+
+    def get(self, input_path: str, options: VadOptions) -> list[dict] | None:
+        try:
+            with open(self._entry_path(input_path, options), "r", encoding="utf-8") as f:
+                return [{"start": int(c["start"]), "end": int(c["end"])} for c in json.load(f)]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def put(self, input_path: str, options: VadOptions, chunks: list[dict]) -> None:
+        try:
+            entry = self._entry_path(input_path, options)
+            tmp_path = entry.with_name(f"{entry.name}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump([{"start": c["start"], "end": c["end"]} for c in chunks], f)
+            os.replace(tmp_path, entry)
+        except OSError:
+            pass
+
+
+def _speech_chunks(
+    audio: np.ndarray,
+    input_path: str,
+    options: VadOptions,
+    vad_cache: _VadCache | None,
+) -> list[dict]:
+    if vad_cache is not None:
+        cached = vad_cache.get(input_path, options)
+        if cached is not None:
+            return cached
+    chunks = get_speech_timestamps(audio, options, sampling_rate=_SAMPLING_RATE)
+    if vad_cache is not None:
+        vad_cache.put(input_path, options, chunks)
+    return chunks
+
+
+def _merge_clips(chunks: list[dict], max_seconds: float) -> list[dict]:
+    """Group consecutive speech chunks into clips (seconds) spanning at most `max_seconds`."""
+    clips: list[dict] = []
+    limit = int(max_seconds * _SAMPLING_RATE)
+    for chunk in chunks:
+        if clips and chunk["end"] - clips[-1]["start"] <= limit:
+            clips[-1]["end"] = chunk["end"]
+        else:
+            clips.append({"start": chunk["start"], "end": chunk["end"]})
+    return [{"start": c["start"] / _SAMPLING_RATE, "end": c["end"] / _SAMPLING_RATE} for c in clips]
+
+
+def _fixed_clips(num_samples: int, clip_seconds: float) -> list[dict]:
+    """Cut `num_samples` of audio into back-to-back clips (seconds) of `clip_seconds`, for batching without VAD."""
+    duration = num_samples / _SAMPLING_RATE
+    starts = np.arange(0.0, duration, clip_seconds)
+    return [{"start": float(start), "end": float(min(start + clip_seconds, duration))} for start in starts]
+
+
+@dataclasses.dataclass
+class _ResumePoint:
+    segments: int
+    offset: float
+    bytes: int
+
+
+def _transcription_settings(args: argparse.Namespace) -> dict:
+    """Settings that shape the output; a .part file is only resumed under the same ones."""
+    return {
+        "model": args.model,
+        "language": args.language,
+        "beam_size": args.beam_size,
+        "vad": not args.no_vad,
+        "vad_threshold": args.vad_threshold,
+    }
+
+
+def _find_resume_point(input_path: str, output_path: str, settings: dict) -> _ResumePoint | None:
+    """
+    Find the last complete segment in `<output>.part`, or None when there is nothing to
+    resume. The resume record must exist and match the input file and `settings`.
+    """
+    part_path = output_path + ".part"
+    if not os.path.exists(part_path):
+        return None
+    try:
+        with open(output_path + ".resume.json", "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        # 没有记录就无法确认部分结果出自同一输入和同一组设置
+        return None
+    if not isinstance(record, dict):
+        return None
+    stat = os.stat(input_path)
+    if record.get("size") != stat.st_size or record.get("mtime_ns") != stat.st_mtime_ns:
+        # 输入文件已经变了，旧的部分结果不能接着用
+        return None
+    if record.get("settings") != settings:
+        # 换了模型/语言/VAD/beam，接着写会把两种结果拼在一起
+        return None
+
+    with open(part_path, "rb") as f:
+        data = f.read()
+    pos = count = 0
+    offset = 0.0
+    while True:
+        match = _SRT_BLOCK_RE.match(data, pos)
+        if not match or int(match.group(1)) != count + 1:
+            break
+        count += 1
+        offset = float(match.group(3))
+        pos = match.end()
+    if not count:
+        return None
+    return _ResumePoint(segments=count, offset=offset, bytes=pos)
+
+
+def _chunks_within(chunks: list[dict], start_sample: int, end_sample: int) -> list[dict]:
+    """Keep the speech chunks overlapping [start_sample, end_sample), clipped to that range."""
+    return [
+        {"start": max(chunk["start"], start_sample), "end": min(chunk["end"], end_sample)}
+        for chunk in chunks
+        if chunk["end"] > start_sample and chunk["start"] < end_sample
+    ]
+
+
+def _split_ranges(chunks: list[dict], start_sample: int, end_sample: int, parts: int) -> list[tuple[int, int]]:
+    """Cut [start_sample, end_sample) into up to `parts` ranges of similar length at silences between chunks."""
+    gaps = [
+        (left["end"] + right["start"]) // 2
+        for left, right in zip(chunks, chunks[1:])
+        if left["end"] < right["start"]
+    ]
+    bounds = [start_sample]
+    for k in range(1, max(1, parts)):
+        target = start_sample + (end_sample - start_sample) * k // parts
+        later = [gap for gap in gaps if bounds[-1] < gap < end_sample]
+        if not later:
+            break
+        bounds.append(min(later, key=lambda gap: abs(gap - target)))
+    bounds.append(end_sample)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _shift_segments(segments: Iterable, seconds: float) -> Iterable:
+    for seg in segments:
+        yield dataclasses.replace(seg, start=seg.start + seconds, end=seg.end + seconds)
+
+
+class _SrtWriter:
+    """
+    Stream segments into `<output>.part`, fsync periodically and rename it onto the
+    final path only once transcription completes, so a crash never leaves a truncated
+    .srt behind. After every sync the segment count, the end time of the last segment
+    and the synced byte length are recorded in `<output>.resume.json`. With a resume
+    point the .part file is cut back to its last complete segment and appended to.
+    `settings` is stored in the record so a later run only resumes under the same ones.
+    """
+
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        resume: _ResumePoint | None = None,
+        settings: dict | None = None,
+    ) -> None:
+        self.input_path = os.path.abspath(input_path)
+        self.settings = settings
+        self.output_path = output_path
+        self.part_path = output_path + ".part"
+        self.resume_path = output_path + ".resume.json"
+        self.count = 0
+        self.offset = 0.0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        if resume is None:
+            self._f = open(self.part_path, "w", encoding="utf-8")
+        else:
+            with open(self.part_path, "r+b") as f:
+                f.truncate(resume.bytes)
+            self._f = open(self.part_path, "a", encoding="utf-8")
+            self.count = resume.segments
+            self.offset = resume.offset
+
+    def write(self, start: float, end: float, text: str) -> None:
+        self.count += 1
+        self._f.write(f"{self.count}\n{start:.2f} --> {end:.2f}\n{text}\n\n")
+        self.offset = end
+        self._unsynced += 1
+        if self._unsynced >= _SYNC_EVERY_SEGMENTS or time.monotonic() - self._last_sync >= _SYNC_EVERY_SECONDS:
+            self._sync()
+
+    def _sync(self) -> None:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        stat = os.stat(self.input_path)
+        record = {
+            "input": self.input_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "settings": self.settings,
+            "segments": self.count,
+            "offset": self.offset,
+            "bytes": self._f.tell(),
+        }
+        tmp_path = self.resume_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, self.resume_path)
+
+    def commit(self) -> None:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        os.replace(self.part_path, self.output_path)
+        try:
+            os.remove(self.resume_path)
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        """Stop without publishing; the .part file and resume record stay for a later run."""
+        if not self._f.closed:
+            self._f.flush()
+            self._f.close()
 
 
 def _transcribe_to_srt(
@@ -26,69 +539,425 @@ def _transcribe_to_srt(
     beam_size: int,
     vad_filter: bool,
     vad_threshold: float,
-) -> None:
+    batched: bool = False,
+    batch_size: int = 8,
+    log_progress: bool = True,
+    audio: np.ndarray | None = None,
+    vad_cache: _VadCache | None = None,
+    resume: _ResumePoint | None = None,
+    split: int = 1,
+    settings: dict | None = None,
+) -> dict[str, float]:
+    started = time.perf_counter()
     kwargs = {
         "task": "transcribe",
         "language": language,
         "beam_size": beam_size,
         "without_timestamps": False,
-        "log_progress": True,
+        "log_progress": log_progress,
     }
-    if vad_filter:
-        kwargs["vad_filter"] = True
-        kwargs["vad_parameters"] = {"threshold": vad_threshold}
 
-    segments, _info = model.transcribe(input_path, **kwargs)
+    # VAD 由这里自己做（结果可缓存），所以总是先拿到解码后的音频
+    if audio is None:
+        audio = decode_audio(input_path, sampling_rate=_SAMPLING_RATE)
+    # 续转时只处理上次最后一个完整片段之后的音频
+    start_seconds = resume.offset if resume else 0.0
+    start_sample = min(int(round(start_seconds * _SAMPLING_RATE)), audio.shape[0])
+    audio_seconds = (audio.shape[0] - start_sample) / _SAMPLING_RATE
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        for i, seg in enumerate(segments, 1):
-            f.write(f"{i}\n{seg.start:.2f} --> {seg.end:.2f}\n{seg.text}\n\n")
+    chunk_length = model.feature_extractor.chunk_length
+    if batched:
+        # 批量管线默认开启 VAD；这里传入（缓存的）语音片段作为 clip_timestamps，由 batch_size 并行解码
+        kwargs["vad_filter"] = False
+        vad_options = VadOptions(threshold=vad_threshold, max_speech_duration_s=chunk_length)
+    else:
+        vad_options = VadOptions(threshold=vad_threshold)
+    # 分段并行即使关闭了 VAD 也需要语音片段来找静音切点
+    speech = _speech_chunks(audio, input_path, vad_options, vad_cache) if vad_filter or split > 1 else []
+    ranges = _split_ranges(speech, start_sample, audio.shape[0], split)
+    kwargs["log_progress"] = log_progress and len(ranges) == 1
 
+    def transcribe_range(range_start: int, range_end: int) -> Iterable:
+        if vad_filter:
+            chunks = _chunks_within(speech, range_start, range_end)
+            if not chunks:
+                return ()
+            if batched:
+                segments, _info = BatchedInferencePipeline(model).transcribe(
+                    audio, batch_size=batch_size, clip_timestamps=_merge_clips(chunks, chunk_length), **kwargs
+                )
+                return segments
+            # 与 transcribe(vad_filter=True) 相同：只解码语音部分，再把时间戳映射回原音频
+            audio_chunks, _metadata = collect_chunks(audio, chunks)
+            segments, _info = model.transcribe(np.concatenate(audio_chunks, axis=0), **kwargs)
+            return restore_speech_timestamps(segments, chunks, _SAMPLING_RATE)
+        if batched:
+            # 关闭 VAD 时批量管线要求显式给出 clip_timestamps，按固定 30 秒窗口切分
+            segments, _info = BatchedInferencePipeline(model).transcribe(
+                audio[range_start:range_end],
+                batch_size=batch_size,
+                clip_timestamps=_fixed_clips(range_end - range_start, chunk_length),
+                **kwargs,
+            )
+        else:
+            segments, _info = model.transcribe(audio[range_start:range_end], **kwargs)
+        return _shift_segments(segments, range_start / _SAMPLING_RATE)
+
+    writer = _SrtWriter(input_path, output_path, resume=resume, settings=settings)
+    try:
+        if len(ranges) == 1:
+            for seg in transcribe_range(*ranges[0]):
+                writer.write(seg.start, seg.end, seg.text)
+        else:
+            # 各段并行转写，按时间顺序写出；靠前的段一完成就先落盘
+            with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+                futures = [pool.submit(lambda r: list(transcribe_range(*r)), r) for r in ranges]
+                for future in futures:
+                    for seg in future.result():
+                        writer.write(seg.start, seg.end, seg.text)
+    except BaseException:
+        writer.close()
+        raise
+    writer.commit()
+    count = writer.count
+
+    wall = time.perf_counter() - started
+    rtf = wall / audio_seconds if audio_seconds > 0 else 0.0
+    return {"audio_seconds": audio_seconds, "wall_seconds": wall, "rtf": rtf, "segments": float(count)}
 
 
 def _build_arg_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Batch transcribe files with faster-whisper.")
-    parser.add_argument("inputs", nargs="+", help="Input audio/video paths.")
+    parser.add_argument("inputs", nargs="*", help="Input audio/video paths.")
     parser.add_argument("--model", default="large-v3", help="Whisper model name.")
     parser.add_argument("--language", default="ja", help="Language code.")
-    parser.add_argument("--device", default="cuda", help="Device for inference.")
-    parser.add_argument("--compute-type", default="float16", help="Compute type.")
+    parser.add_argument("--device", default="auto", help="Device for inference (auto = CUDA if available, else CPU).")
+    parser.add_argument(
+        "--compute-type",
+        default="auto",
+        help="Compute type (auto = float16 on CUDA, int8 on CPU, or the closest supported type).",
+    )
     parser.add_argument("--beam-size", type=int, default=5, help="Beam size.")
     parser.add_argument("--vad-threshold", type=float, default=0.6, help="VAD threshold.")
     parser.add_argument("--no-vad", action="store_true", help="Disable VAD.")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "Continue an interrupted transcription from the last complete segment in <output>.srt.part "
+            "(only when model, language, VAD and beam settings match the interrupted run)."
+        ),
+    )
+    parser.add_argument(
+        "--batched",
+        action="store_true",
+        help="Use faster-whisper's BatchedInferencePipeline over VAD chunks.",
+    )
+    parser.add_argument("--batch-size", type=int, default=8, help="Chunks decoded together in --batched mode.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Transcribe this many files in parallel with one shared model (longest file first).",
+    )
+    parser.add_argument(
+        "--split",
+        type=int,
+        default=1,
+        help="Cut each file at VAD silences into this many chunks and transcribe them in parallel.",
+    )
+    parser.add_argument(
+        "--cpu-threads",
+        type=int,
+        default=0,
+        help="CPU threads per worker (0 = split the machine's cores across --workers).",
+    )
+    parser.add_argument(
+        "--prefetch-mb",
+        type=int,
+        default=1024,
+        help="Memory budget for audio decoded ahead of the current file (0 disables prefetch).",
+    )
+    parser.add_argument(
+        "--audio-cache-dir",
+        default=str(_BASE_DIR / "cache" / "audio"),
+        help="Where decoded audio is cached for later runs.",
+    )
+    parser.add_argument(
+        "--audio-cache-mb",
+        type=int,
+        default=4096,
+        help="Size limit of the decoded audio cache (0 disables it).",
+    )
+    parser.add_argument(
+        "--vad-cache-dir",
+        default=str(_BASE_DIR / "cache" / "vad"),
+        help="Where VAD speech segments are cached per input and VAD settings (empty disables).",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Keep the model loaded and read jobs from stdin (one JSON object or path per line).",
+    )
     return parser
 
 
-def main(argv: list[str]) -> int:
-    parser = _build_arg_parser()
-    args = parser.parse_args(argv)
+def _process_input(
+    model: WhisperModel,
+    input_path: str,
+    args: argparse.Namespace,
+    tag: str = "",
+    audio: np.ndarray | None = None,
+    cache: _AudioCache | None = None,
+    vad_cache: _VadCache | None = None,
+) -> bool:
+    _emit(f"{tag}starting to process: {input_path}")
+    if not os.path.exists(input_path):
+        _emit(f"{tag}missing file: {input_path}")
+        return False
+
+    output_path = str(Path(input_path).with_suffix(".srt"))
+    try:
+        settings = _transcription_settings(args)
+        resume = _find_resume_point(input_path, output_path, settings) if args.resume else None
+        if resume:
+            _emit(f"{tag}resuming at {resume.offset:.2f}s after {resume.segments} segments: {input_path}")
+        if audio is None and cache is not None:
+            audio = _load_audio(input_path, cache)
+        stats = _transcribe_to_srt(
+            model=model,
+            input_path=input_path,
+            output_path=output_path,
+            language=args.language,
+            beam_size=args.beam_size,
+            vad_filter=not args.no_vad,
+            vad_threshold=args.vad_threshold,
+            batched=args.batched,
+            batch_size=args.batch_size,
+            log_progress=args.workers <= 1,
+            split=max(1, args.split),
+            audio=audio,
+            vad_cache=vad_cache,
+            resume=resume,
+            settings=settings,
+        )
+    except Exception as exc:
+        _emit(f"{tag}failed to transcribe {input_path}: {exc}")
+        return False
+
+    mode = f"batched, batch size {args.batch_size}" if args.batched else "sequential"
+    if args.split > 1:
+        mode += f", split {args.split}"
+    _emit(
+        f"{tag}real-time factor: {stats['rtf']:.3f} "
+        f"(audio {stats['audio_seconds']:.1f}s, wall {stats['wall_seconds']:.1f}s, {mode})"
+    )
+    _emit(f"{tag}finished processing: {input_path}")
+    return True
+
+
+def _model_threads(args: argparse.Namespace) -> tuple[int, int]:
+    # 每个并发转写（文件 × 分段）都需要一个 CTranslate2 worker
+    workers = max(1, args.workers) * max(1, args.split)
+    cpu_threads = args.cpu_threads
+    # CTranslate2 默认只用 4 个线程；CPU 上把所有核心分给各个 worker
+    if not cpu_threads and args.device == "cpu":
+        cpu_threads = max(1, (os.cpu_count() or 1) // workers)
+    return cpu_threads, workers
+
+
+def _load_model(args: argparse.Namespace, model_name: str, warm_up: bool = False) -> WhisperModel:
+    cpu_threads, num_workers = _model_threads(args)
+    model = _create_model(
+        model_name,
+        device=args.device,
+        compute_type=args.compute_type,
+        cpu_threads=cpu_threads,
+        num_workers=num_workers,
+    )
+    threads = f", cpu threads {cpu_threads or 'default'}" if args.device == "cpu" else ""
+    _emit(f"backend: {args.device}, {args.compute_type}{threads}, workers {num_workers}")
+    if warm_up:
+        _emit(f"warm-up: {_warm_up(model, args.language):.1f}x real time")
+    return model
 
-    model = _create_model(args.model, device=args.device, compute_type=args.compute_type)
+
+def _create_audio_cache(args: argparse.Namespace) -> _AudioCache | None:
+    if args.audio_cache_mb <= 0:
+        return None
+    try:
+        return _AudioCache(Path(args.audio_cache_dir), args.audio_cache_mb * 1024 * 1024)
+    except OSError as exc:
+        _emit(f"audio cache disabled: {exc}")
+        return None
+
+
+def _create_vad_cache(args: argparse.Namespace) -> _VadCache | None:
+    if not args.vad_cache_dir:
+        return None
+    try:
+        return _VadCache(Path(args.vad_cache_dir))
+    except OSError as exc:
+        _emit(f"VAD cache disabled: {exc}")
+        return None
+
+
+def _create_prefetcher(
+    paths: list[str],
+    args: argparse.Namespace,
+    cache: _AudioCache | None,
+) -> _AudioPrefetcher | None:
+    if args.prefetch_mb <= 0 or len(paths) < 2:
+        return None
+    return _AudioPrefetcher(paths, args.prefetch_mb * 1024 * 1024, cache)
+
+
+def _run_sequential(model: WhisperModel, args: argparse.Namespace) -> bool:
+    """Transcribe args.inputs in order, decoding the next file ahead; returns True on any failure."""
+    cache = _create_audio_cache(args)
+    vad_cache = _create_vad_cache(args)
+    prefetcher = _create_prefetcher(args.inputs, args, cache)
     failed = False
+    try:
+        for index, input_path in enumerate(args.inputs):
+            audio = prefetcher.take(index) if prefetcher else None
+            if not _process_input(model, input_path, args, audio=audio, cache=cache, vad_cache=vad_cache):
+                failed = True
+            del audio
+    finally:
+        if prefetcher:
+            prefetcher.close()
+    return failed
 
-    for input_path in args.inputs:
-        print(f"starting to process: {input_path}", flush=True)
-        if not os.path.exists(input_path):
-            print(f"missing file: {input_path}", flush=True)
-            failed = True
-            continue
 
-        output_path = str(Path(input_path).with_suffix(".srt"))
+def _run_parallel(model: WhisperModel, args: argparse.Namespace) -> bool:
+    """Transcribe args.inputs with args.workers threads, longest file first; returns True on any failure."""
+    ordered = sorted(args.inputs, key=_media_duration, reverse=True)
+    cache = _create_audio_cache(args)
+    vad_cache = _create_vad_cache(args)
+    prefetcher = _create_prefetcher(ordered, args, cache)
+    jobs: queue.Queue[tuple[int, str]] = queue.Queue()
+    for index, input_path in enumerate(ordered):
+        jobs.put((index, input_path))
+
+    def work(worker_id: int) -> bool:
+        failed = False
+        while True:
+            try:
+                index, input_path = jobs.get_nowait()
+            except queue.Empty:
+                return failed
+            audio = prefetcher.take(index) if prefetcher else None
+            tag = f"[worker {worker_id}] "
+            if not _process_input(model, input_path, args, tag=tag, audio=audio, cache=cache, vad_cache=vad_cache):
+                failed = True
+            del audio
+
+    workers = min(max(1, args.workers), len(ordered))
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(work, range(1, workers + 1)))
+    finally:
+        if prefetcher:
+            prefetcher.close()
+    return any(results)
+
+
+def _parse_job(line: str) -> dict:
+    line = line.strip()
+    if line.startswith("{"):
+        return json.loads(line)
+    return {"input": line}
+
+
+def _read_jobs(jobs: queue.Queue, prefetcher: _AudioPrefetcher | None) -> None:
+    """
+    Parse stdin jobs into `jobs` as (job, prefetch index) and queue their inputs for
+    decoding right away; None marks the end of stdin.
+    """
+    for raw in sys.stdin.buffer:
+        line = raw.decode("utf-8", errors="replace").strip()
+        if not line:
+            continue
         try:
-            _transcribe_to_srt(
-                model=model,
-                input_path=input_path,
-                output_path=output_path,
-                language=args.language,
-                beam_size=args.beam_size,
-                vad_filter=not args.no_vad,
-                vad_threshold=args.vad_threshold,
+            job = _parse_job(line)
+        except ValueError as exc:
+            _emit(f"invalid job: {line!r} ({exc})")
+            continue
+        input_path = str(job.get("input", ""))
+        index = prefetcher.add(input_path) if prefetcher and input_path else None
+        jobs.put((job, index))
+    jobs.put(None)
+
+
+def _serve(args: argparse.Namespace) -> int:
+    # 控制器按 UTF-8 解码输出；Windows 下管道默认是本地代码页
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+    cache = _create_audio_cache(args)
+    vad_cache = _create_vad_cache(args)
+    # 控制器一次写入整个队列：后台读 stdin，下一个任务的音频在当前任务转写时解码
+    prefetcher = (
+        _AudioPrefetcher([], args.prefetch_mb * 1024 * 1024, cache, open_ended=True)
+        if args.prefetch_mb > 0
+        else None
+    )
+    jobs: queue.Queue[tuple[dict, int | None] | None] = queue.Queue()
+    threading.Thread(target=_read_jobs, args=(jobs, prefetcher), name="job-reader", daemon=True).start()
+
+    try:
+        model_name = args.model
+        warm_up = "auto" in (args.device, args.compute_type)
+        args.device, args.compute_type = _resolve_backend(args.device, args.compute_type)
+        model = _load_model(args, model_name, warm_up=warm_up)
+        _emit(f"server ready: {model_name}")
+
+        while True:
+            item = jobs.get()
+            if item is None:
+                break
+            job, index = item
+
+            job_model = job.get("model") or model_name
+            if job_model != model_name:
+                # 同一时间只保留一个模型在内存里
+                del model
+                model_name = job_model
+                model = _load_model(args, model_name)
+                _emit(f"server ready: {model_name}")
+
+            job_args = argparse.Namespace(**vars(args))
+            job_args.model = model_name
+            for key in ("language", "beam_size", "vad_threshold", "no_vad", "batched", "batch_size", "resume", "split"):
+                if key in job:
+                    setattr(job_args, key, job[key])
+            audio = prefetcher.take(index) if index is not None else None
+            _process_input(
+                model, str(job.get("input", "")), job_args, audio=audio, cache=cache, vad_cache=vad_cache
             )
-        except Exception as exc:
-            print(f"failed to transcribe {input_path}: {exc}", flush=True)
-            failed = True
+            del audio
+    finally:
+        if prefetcher:
+            prefetcher.close()
+
+    return 0
+
+
+def main(argv: list[str]) -> int:
+    parser = _build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.serve:
+        return _serve(args)
+    if not args.inputs:
+        parser.error("at least one input path is required unless --serve is given")
 
-    return 1 if failed else 0
+    warm_up = "auto" in (args.device, args.compute_type)
+    args.device, args.compute_type = _resolve_backend(args.device, args.compute_type)
+    model = _load_model(args, args.model, warm_up=warm_up)
+    if args.workers > 1 and len(args.inputs) > 1:
+        return 1 if _run_parallel(model, args) else 0
+    return 1 if _run_sequential(model, args) else 0
 
 
 if __name__ == "__main__":
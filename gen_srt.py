@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import json
 import os
 import sys
 from collections import deque
@@ -60,16 +61,19 @@ class SubtitleGenerationController(QObject):
             self._emit_log("请选择至少一个视频文件后再运行。\n")
             return
 
-        if self.batch_process and self.batch_process.state() != QProcess.ProcessState.NotRunning:
-            self._emit_log("已有任务在运行，请等待完成。\n")
-            return
-
         self._emit_log(f"开始处理 {len(items)} 个文件...\n")
-        self._pending_video_files = deque(items)
-        self._has_seen_processing_line = False
-        self._last_processing_file = None
-        self._stdout_buffer = ""
-        self._run_with_python_module(items, model_name)
+        if not self._is_process_running(self.batch_process):
+            self._pending_video_files.clear()
+            self._has_seen_processing_line = False
+            self._last_processing_file = None
+            self._stdout_buffer = ""
+            self._run_with_python_module(model_name)
+            if not self._is_process_running(self.batch_process):
+                return
+
+        # 常驻的 faster-whisper 已加载模型，直接把新文件作为任务提交
+        self._pending_video_files.extend(items)
+        self._submit_whisper_jobs(items, model_name)
         self._update_busy_state()
 
     def enqueue_manual_translations(self, srt_paths: Iterable[Path | str]) -> None:
@@ -98,11 +102,20 @@ class SubtitleGenerationController(QObject):
     def shutdown(self) -> None:
         """在应用退出时停止所有运行中的子进程。"""
 
-        self._terminate_process(self.batch_process)
+        # 先解除引用，进程退出时的 finished 信号不再触发后续处理
+        whisper = self.batch_process
         self.batch_process = None
-        self._terminate_process(self.translation_process)
-        self.translation_progress.emit(0, 0)
+        if self._is_process_running(whisper):
+            whisper.closeWriteChannel()
+        self._terminate_process(whisper)
+        # 先解除引用，worker 退出时的 finished 信号不再触发后续翻译
+        worker = self.translation_process
         self.translation_process = None
+        if self._is_process_running(worker):
+            # 空闲的 worker 读到 EOF 会自行退出
+            worker.closeWriteChannel()
+        self._terminate_process(worker)
+        self.translation_progress.emit(0, 0)
         self.processing_progress.emit("")
         self.translation_queue.clear()
         self.current_translation = None
@@ -167,13 +180,24 @@ class SubtitleGenerationController(QObject):
                 self._handle_stdout_line(line)
 
     def _handle_stdout_line(self, line: str) -> None:
+        # 按“一次只处理一个文件、按提交顺序完成”解析状态行，对应 --serve 模式；
+        # faster-whisper.py --workers 的并行输出（带 [worker N] 前缀、乱序完成）不受支持
+        lowered = line.lower()
+        if lowered.startswith("finished processing:"):
+            self._complete_processing_file(succeeded=True)
+            return
+        if lowered.startswith(("failed to transcribe", "missing file:")):
+            self._complete_processing_file(succeeded=False)
+            return
+
         prefix = "starting to process:"
-        if not line.lower().startswith(prefix):
+        if not lowered.startswith(prefix):
             return
 
         parsed_path = line[len(prefix) :].strip()
         normalized = os.path.abspath(parsed_path) if parsed_path else None
 
+        # 兼容不输出 finished 行的程序：新文件开始即视为上一个完成
         if self._has_seen_processing_line and self._last_processing_file:
             self._emit_log(f"处理完成：{self._last_processing_file}\n")
             self._schedule_translation_for_video(self._last_processing_file)
@@ -183,6 +207,27 @@ class SubtitleGenerationController(QObject):
         if self._last_processing_file:
             self._emit_log(f"开始处理：{self._last_processing_file}\n")
 
+    def _complete_processing_file(self, succeeded: bool) -> None:
+        if self._last_processing_file:
+            if succeeded:
+                self._emit_log(f"处理完成：{self._last_processing_file}\n")
+                self._schedule_translation_for_video(self._last_processing_file)
+            else:
+                self._emit_log(f"处理失败：{self._last_processing_file}\n")
+        self._last_processing_file = None
+        self._has_seen_processing_line = False
+        self.processing_progress.emit("")
+        self._update_busy_state()
+        self._request_file_list_clear_if_idle()
+
+    def _submit_whisper_jobs(self, items: List[str], model_name: str) -> None:
+        if not self.batch_process:
+            return
+        for path in items:
+            # 上次中断留下的 .srt.part 会从最后一个完整片段处续转
+            job = {"input": path, "model": model_name, "language": "ja", "resume": True}
+            self.batch_process.write((json.dumps(job) + "\n").encode("utf-8"))
+
     def _schedule_translation_for_video(self, video_path: str) -> None:
         """延迟 3 秒后将字幕路径加入翻译队列。"""
 
@@ -228,6 +273,8 @@ class SubtitleGenerationController(QObject):
             process.waitForFinished(3000)
 
     def _handle_process_finished(self, exit_code: int, _exit_status: QProcess.ExitStatus) -> None:
+        if self.sender() is not self.batch_process:
+            return
         if exit_code in self.IGNORED_BATCH_EXIT_CODES:
             self._emit_log(
                 "任务结束。\n"
@@ -241,6 +288,8 @@ class SubtitleGenerationController(QObject):
         self._request_file_list_clear_if_idle()
 
     def _handle_process_error(self, error: QProcess.ProcessError) -> None:
+        if self.sender() is not self.batch_process:
+            return
         # self._emit_log(f"faster-whisper 进程异常：{error}，尝试继续后续翻译。\n")
         self.batch_process = None
         # 即使 faster-whisper 异常退出，也要把最后一个视频的字幕排队
@@ -278,7 +327,8 @@ class SubtitleGenerationController(QObject):
 
         self._launch_process(str(exe_path), arguments, str(exe_path.parent))
 
-    def _run_with_python_module(self, items: List[str], model_name: str) -> None:
+    def _run_with_python_module(self, model_name: str) -> None:
+        """以常驻模式启动 faster-whisper.py，任务随后通过 stdin 提交。"""
         base_dir = Path(__file__).resolve().parent
         script_path = base_dir / "faster-whisper.py"
         if not script_path.exists():
@@ -292,7 +342,7 @@ class SubtitleGenerationController(QObject):
         python_exec = sys.executable or "python"
         arguments = [
             str(script_path),
-            *items,
+            "--serve",
             "--model",
             model_name,
             "--language",
@@ -340,7 +390,7 @@ class SubtitleGenerationController(QObject):
         self._update_busy_state()
 
     def _start_next_translation(self) -> None:
-        if self._is_process_running(self.translation_process) or self._waiting_translation_path:
+        if self.current_translation or self._waiting_translation_path:
             return
 
         while self.translation_queue:
@@ -378,11 +428,24 @@ class SubtitleGenerationController(QObject):
         )
 
     def _maybe_handle_translation_idle(self) -> None:
-        if not self.translation_queue and not self._is_process_running(self.translation_process) and not self._waiting_translation_path:
+        if not self.translation_queue and not self.current_translation and not self._waiting_translation_path:
             self._request_file_list_clear_if_idle()
             self._update_busy_state()
 
     def _run_translation_process(self, srt_path: str) -> bool:
+        """把字幕路径交给常驻翻译 worker（必要时先启动它）。"""
+
+        if not self._ensure_translation_worker():
+            return False
+        assert self.translation_process is not None
+        self.translation_process.write((srt_path + "\n").encode("utf-8"))
+        self.translation_progress.emit(0, 0)
+        return True
+
+    def _ensure_translation_worker(self) -> bool:
+        if self._is_process_running(self.translation_process):
+            return True
+
         base_dir = Path(__file__).resolve().parent
         script_path = base_dir / "translate.py"
         if not script_path.exists():
@@ -392,7 +455,7 @@ class SubtitleGenerationController(QObject):
         python_exec = sys.executable or "python"
         process = QProcess(self)
         process.setProgram(python_exec)
-        process.setArguments([str(script_path), srt_path])
+        process.setArguments([str(script_path), "--worker"])
         process.setWorkingDirectory(str(base_dir))
         process.setProcessChannelMode(QProcess.ProcessChannelMode.MergedChannels)
         process.readyReadStandardOutput.connect(self._handle_translation_output)
@@ -400,12 +463,12 @@ class SubtitleGenerationController(QObject):
         process.finished.connect(self._handle_translation_finished)
 
         self.translation_process = process
+        self._translation_stdout_buffer = ""
         process.start()
         if not process.waitForStarted(5000):
             self._emit_translation("字幕翻译进程启动失败。\n")
             self.translation_process = None
             return False
-        self.translation_progress.emit(0, 0)
         return True
 
     def _handle_translation_output(self) -> None:
@@ -427,6 +490,15 @@ class SubtitleGenerationController(QObject):
                 self._handle_translation_stdout_line(line)
 
     def _handle_translation_stdout_line(self, line: str) -> None:
+        if line.startswith(("[WORKER] ready", "[JOB START]")):
+            return
+        if line.startswith("[JOB DONE]"):
+            self._finish_current_translation(True)
+            return
+        if line.startswith("[JOB FAILED]"):
+            self._finish_current_translation(False)
+            return
+
         prefix = "[PROGRESS]"
         if line.startswith(prefix):
             payload = line[len(prefix) :].strip()
@@ -441,29 +513,46 @@ class SubtitleGenerationController(QObject):
             return
         self._emit_translation(line + "\n")
 
-    def _handle_translation_finished(self, exit_code: int, exit_status: QProcess.ExitStatus) -> None:
+    def _finish_current_translation(self, success: bool, detail: str = "") -> None:
         filename = self.current_translation or "未知字幕"
-        if exit_status == QProcess.ExitStatus.NormalExit and exit_code == 0:
+        if success:
             self._emit_translation(f"{filename} 翻译完成。\n")
             if self.current_translation:
                 video_path = self._srt_to_video.pop(self.current_translation, None)
                 if video_path:
                     self._emit_file_completed(video_path)
         else:
-            self._emit_translation(f"{filename} 翻译失败，退出码 {exit_code}。\n")
+            self._emit_translation(f"{filename} 翻译失败{detail}。\n")
         self.translation_progress.emit(0, 0)
-        self.translation_process = None
         self.current_translation = None
         self._start_next_translation()
         self._maybe_handle_translation_idle()
         self._update_busy_state()
 
+    def _handle_translation_finished(self, exit_code: int, exit_status: QProcess.ExitStatus) -> None:
+        # worker 正常情况下常驻；退出时若还有进行中的字幕则按失败处理，下一个任务会重新拉起 worker
+        if self.sender() is not self.translation_process:
+            return
+        self.translation_process = None
+        if self.current_translation:
+            self._finish_current_translation(False, f"，退出码 {exit_code}")
+            return
+        self._start_next_translation()
+        self._maybe_handle_translation_idle()
+        self._update_busy_state()
+
     def _handle_translation_error(self, error: QProcess.ProcessError) -> None:
+        if self.sender() is not self.translation_process:
+            return
         filename = self.current_translation or "未知字幕"
         self._emit_translation(f"{filename} 翻译进程错误：{error}。\n")
-        self.translation_progress.emit(0, 0)
+        process = self.translation_process
         self.translation_process = None
-        self.current_translation = None
+        if process is not None and process.state() != QProcess.ProcessState.NotRunning:
+            process.kill()
+        if self.current_translation:
+            self._finish_current_translation(False)
+            return
         self._start_next_translation()
         self._maybe_handle_translation_idle()
         self._update_busy_state()
@@ -473,12 +562,10 @@ class SubtitleGenerationController(QObject):
     # ------------------------------------------------------------------
     def _request_file_list_clear_if_idle(self) -> None:
         if (
-            not self._is_process_running(self.batch_process)
-            and not self._is_process_running(self.translation_process)
+            not self._has_pending_whisper_work()
+            and not self.current_translation
             and not self.translation_queue
             and not self._waiting_translation_path
-            and not self._pending_video_files
-            and not self._has_seen_processing_line
         ):
             self.request_file_list_clear.emit()
 
@@ -490,12 +577,16 @@ class SubtitleGenerationController(QObject):
 
     def _is_busy(self) -> bool:
         return bool(
-            self._is_process_running(self.batch_process)
-            or self._is_process_running(self.translation_process)
+            self._has_pending_whisper_work()
+            or self.current_translation
             or self.translation_queue
             or self._waiting_translation_path
         )
 
+    def _has_pending_whisper_work(self) -> bool:
+        # faster-whisper 常驻运行，是否忙碌看是否还有未完成的视频
+        return bool(self._pending_video_files or self._has_seen_processing_line)
+
     @staticmethod
     def _is_process_running(process: QProcess | None) -> bool:
         return bool(process and process.state() != QProcess.ProcessState.NotRunning)
@@ -9,14 +9,26 @@ Output:
 """
 
 from __future__ import annotations
+import argparse
+import asyncio
+import hashlib
+import json
 import os
+import random
 import re
+import socket
+import sqlite3
 import sys
+import threading
 import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import List, Sequence, Tuple, Dict, Optional
+from typing import Callable, List, Sequence, Tuple, Dict, Optional, TypeVar
 
 import requests
+from requests.adapters import HTTPAdapter
 
 
 # ======================
@@ -25,6 +37,8 @@ import requests
 
 API_BASE = "http://localhost:1234"           # LM Studio server base
 API_KEY = "lm-studio"                        # placeholder; LM Studio usually ignores it
+# 多个推理服务：[(base_url, 该端点同时在途的请求上限), ...]；留空则只用 API_BASE
+API_ENDPOINTS: List[Tuple[str, int]] = []
 MODEL_NAME = "Sakura GalTransl 7B v3"   # ←←← 必须改
 TEMPERATURE = 0.2
 TIMEOUT = 300
@@ -36,13 +50,52 @@ MAX_TOKENS_LINE = 256
 # 批量大小：5000行字幕推荐 15~25
 BATCH_SIZE = 20
 
+# 自适应 batch：按估算 token 数装箱，连续成功时放大、出现错行时缩小
+ADAPTIVE_BATCHING = True
+BATCH_SIZE_MIN = 4
+BATCH_SIZE_MAX = 40
+BATCH_TOKEN_BUDGET = int(MAX_TOKENS_BATCH * 0.75)  # 预估输出 token 上限，给标签和译文长度波动留余量
+BATCH_GROW_AFTER = 3  # 连续多少个 batch 首轮全对后放大一次
+BATCH_SHRINK_BELOW = 0.9  # 首轮成功率（滑动平均）低于此值时减半
+
+# 并发：同时在途的 batch 数（服务端支持并行推理时调大；1 = 串行）
+MAX_IN_FLIGHT_BATCHES = 4
+
 # 重试
 MAX_RETRIES = 3
-RETRY_BACKOFF_BASE = 0.6  # seconds
+RETRY_BACKOFF_BASE = 0.6  # seconds，实际等待带随机抖动
+BATCH_TIMEOUT = 600  # 单次请求（含流式读完）的总时限，超时按失败重试
+
+# 流式输出（SSE）：边生成边提交已完成的行；服务端不支持时自动按普通 JSON 处理
+STREAM_ENABLED = True
+STREAM_ABORT_AFTER = 3  # 流中出现这么多条无标签/越界/重复标签的行即视为跑偏，提前断开
+
+# 提示词缓存：请求里带上 cache_prompt（llama.cpp），让服务端复用上一批已算好的
+# system prompt 前缀（KV cache）；结束时按 usage/timings 统计省下的 prompt 处理时间
+PROMPT_CACHE_ENABLED = True
+
+# 端点健康：连续失败这么多次后暂时摘除，冷却后再放回
+ENDPOINT_EJECT_AFTER = 3
+ENDPOINT_COOLDOWN = 30.0  # seconds
+
+# HTTP 连接池（keep-alive）；translate_file 为每个文件按并发数建自己的连接池
+HTTP_POOL_SIZE = MAX_IN_FLIGHT_BATCHES
+
+# 翻译记忆（跨文件的磁盘缓存，按 LRU 淘汰）
+TM_ENABLED = True
+TM_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "translation_memory.sqlite3")
+TM_MAX_ENTRIES = 200_000
+
+# 断点续译：每完成一个 batch 追加写入 <字幕>.ckpt.jsonl，成功后删除
+CHECKPOINT_ENABLED = True
+CHECKPOINT_SUFFIX = ".ckpt.jsonl"
 
 # 行标签（用于可靠拆分）
 LINE_TAG_FMT = "<L{}>"
 
+# 解析输出时匹配行标签，由 LINE_TAG_FMT 推出
+LINE_TAG_RE = re.compile("^" + re.escape(LINE_TAG_FMT).replace(re.escape("{}"), r"(\d+)") + r"\s*(.*)$")
+
 # 跳过规则：音效/注释/音乐符号等（你可按需放宽）
 SKIP_RE = re.compile(r"^\s*(\[.*?\]|\(.*?\)|（.*?）|♪.*)\s*$")
 
@@ -83,6 +136,14 @@ class SubtitleEntry:
     lines: List[str]
 
 
+@dataclass
+class ChunkResult:
+    lines: List[str]
+    requests: int = 0           # 该 batch 实际发出的请求数（含兜底）
+    first_pass: int = 0         # 首次请求就正确返回的行数
+    fallback_requests: int = 0  # 其中兜底路径消耗的请求数
+
+
 class TranslationError(RuntimeError):
     """Raised when the translation endpoint returns an invalid response."""
 
@@ -155,47 +216,797 @@ def default_output_path(source_path: str) -> str:
     return os.path.join(directory or ".", f"{stem}.chs{ext}")
 
 
+# ======================
+# 状态输出（多线程下整行写出，避免 [PROGRESS] 行被打断）
+# ======================
+
+_stdout_lock = threading.Lock()
+
+
+def emit_line(text: str) -> None:
+    with _stdout_lock:
+        sys.stdout.write(text + "\n")
+        sys.stdout.flush()
+
+
+# ======================
+# 翻译记忆（SQLite）
+# ======================
+
+def normalize_source_line(line: str) -> str:
+    """Normalize a source line for cache lookups (全角/半角、首尾空白、连续空白)."""
+    text = unicodedata.normalize("NFKC", line).strip()
+    return re.sub(r"\s+", " ", text)
+
+
+def _prompt_fingerprint() -> str:
+    digest = hashlib.sha1()
+    for part in (SYSTEM_PROMPT_BATCH, SYSTEM_PROMPT_LINE):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class TranslationMemory:
+    """
+    On-disk translation memory keyed by (normalized line, model, prompt hash).
+    Entries are evicted least-recently-used first once `max_entries` is exceeded.
+    A database error (locked, corrupt) disables the memory for the rest of the run.
+    """
+
+    def __init__(self, path: str, model_name: str, max_entries: int = TM_MAX_ENTRIES) -> None:
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.failed = False
+        self._namespace = f"{model_name}\0{_prompt_fingerprint()}"
+        self._lock = threading.Lock()
+        self._touched: List[str] = []  # 命中的 key，批量刷新 last_used，避免每次命中都提交一次事务
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tm ("
+                " key TEXT PRIMARY KEY,"
+                " source TEXT NOT NULL,"
+                " target TEXT NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS tm_last_used ON tm(last_used)")
+        self._size = self._conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+
+    def _key(self, line: str) -> str:
+        raw = f"{self._namespace}\0{normalize_source_line(line)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _disable(self, exc: sqlite3.Error) -> None:
+        # 缓存可有可无：数据库被锁或损坏时停用它，翻译照常继续
+        if not self.failed:
+            self.failed = True
+            emit_line(f"[CACHE] translation memory disabled: {exc}")
+
+    def get(self, line: str) -> Optional[str]:
+        key = self._key(line)
+        with self._lock:
+            if self.failed:
+                self.misses += 1
+                return None
+            try:
+                row = self._conn.execute("SELECT target FROM tm WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as exc:
+                self._disable(exc)
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched.append(key)
+            return row[0]
+
+    def _flush_touched(self) -> None:
+        if not self._touched:
+            return
+        now = time.time()
+        self._conn.executemany("UPDATE tm SET last_used = ? WHERE key = ?", [(now, key) for key in self._touched])
+        self._touched.clear()
+
+    def put_many(self, pairs: Sequence[Tuple[str, str]]) -> None:
+        now = time.time()
+        rows = [
+            (self._key(src), normalize_source_line(src), out, now)
+            for src, out in pairs
+            # 兜底失败时译文会原样返回原文，这种结果不入库
+            if out and out.strip() != src.strip()
+        ]
+        if not rows:
+            return
+        with self._lock:
+            if self.failed:
+                return
+            try:
+                self._put_rows(rows)
+            except sqlite3.Error as exc:
+                self._disable(exc)
+
+    def _put_rows(self, rows: List[Tuple[str, str, str, float]]) -> None:
+        with self._conn:
+            self._flush_touched()
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT INTO tm (key, source, target, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET target = excluded.target, last_used = excluded.last_used",
+                rows,
+            )
+            # ON CONFLICT 更新也计入 changes，这里只做近似计数，淘汰时再以实际数量为准
+            self._size += self._conn.total_changes - before
+            if self._size > self.max_entries:
+                self._size = self._conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+                overflow = self._size - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM tm WHERE key IN (SELECT key FROM tm ORDER BY last_used LIMIT ?)",
+                        (overflow,),
+                    )
+                    self._size -= overflow
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                if not self.failed:
+                    with self._conn:
+                        self._flush_touched()
+            except sqlite3.Error as exc:
+                self._disable(exc)
+            finally:
+                self._conn.close()
+
+
+def open_translation_memory() -> Optional[TranslationMemory]:
+    if not TM_ENABLED:
+        return None
+    try:
+        os.makedirs(os.path.dirname(TM_PATH) or ".", exist_ok=True)
+        return TranslationMemory(TM_PATH, MODEL_NAME, TM_MAX_ENTRIES)
+    except (OSError, sqlite3.Error) as exc:
+        emit_line(f"[CACHE] translation memory disabled: {exc}")
+        return None
+
+
+# ======================
+# 断点续译（sidecar checkpoint）
+# ======================
+
+class TranslationCheckpoint:
+    """
+    Append-only JSON-lines sidecar recording translated positions of one SRT.
+    The first line is a header with a fingerprint of the source lines; a checkpoint
+    whose fingerprint no longer matches (file re-generated, model changed) is discarded.
+    """
+
+    def __init__(self, srt_path: str, source_lines: Sequence[str]) -> None:
+        self.path = os.path.abspath(srt_path) + CHECKPOINT_SUFFIX
+        digest = hashlib.sha1(MODEL_NAME.encode("utf-8"))
+        for line in source_lines:
+            digest.update(b"\n")
+            digest.update(line.encode("utf-8"))
+        self.fingerprint = digest.hexdigest()
+        self._handle = None
+
+    def load(self) -> Dict[int, str]:
+        """Return {position in source_lines: 译文} saved by a previous, interrupted run."""
+        restored: Dict[int, str] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                lines = handle.read().splitlines()
+        except OSError:
+            return restored
+
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except ValueError:
+            header = {}
+        if header.get("fingerprint") != self.fingerprint:
+            return restored
+
+        for raw in lines[1:]:
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                # 进程被杀时最后一行可能只写了一半
+                continue
+            for pos, text in record.get("lines", []):
+                restored[int(pos)] = text
+        return restored
+
+    def start(self, resumed: bool) -> None:
+        if resumed:
+            self._handle = open(self.path, "a", encoding="utf-8")
+            return
+        self._handle = open(self.path, "w", encoding="utf-8")
+        self._write({"version": 1, "fingerprint": self.fingerprint})
+
+    def append(self, translated: Sequence[Tuple[int, str]]) -> None:
+        if self._handle is None or not translated:
+            return
+        self._write({"lines": [[pos, text] for pos, text in translated]})
+
+    def _write(self, record: Dict[str, object]) -> None:
+        assert self._handle is not None
+        self._handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._handle.flush()
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def remove(self) -> None:
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
 # ======================
 # API 调用（重试 + 校验）
 # ======================
 
-def call_chat_completions(system_prompt: str, user_content: str, max_tokens: int) -> str:
-    url = API_BASE.rstrip("/") + "/v1/chat/completions"
-    payload = {
+_session: Optional[requests.Session] = None
+_session_pool_size = (0, 0)
+_session_lock = threading.Lock()
+
+
+def configure_session(pool_size: int = HTTP_POOL_SIZE, hosts: int = 1) -> requests.Session:
+    """
+    Return the shared keep-alive session, rebuilding it if `pool_size` changed.
+    `hosts` is how many endpoints get their own connection pool.
+    """
+    global _session, _session_pool_size
+    pool_size = max(1, pool_size)
+    hosts = max(1, hosts)
+    with _session_lock:
+        if _session is not None and _session_pool_size == (pool_size, hosts):
+            return _session
+        if _session is not None:
+            _session.close()
+        _session = new_session(pool_size, hosts)
+        _session_pool_size = (pool_size, hosts)
+        return _session
+
+
+def new_session(pool_size: int, hosts: int = 1) -> requests.Session:
+    """Build a keep-alive session with `hosts` connection pools of `pool_size` connections."""
+    session = requests.Session()
+    # 重试由 call_chat_completions 自己处理，这里不让 urllib3 再重试
+    adapter = HTTPAdapter(pool_connections=max(1, hosts), pool_maxsize=max(1, pool_size), max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    session = _session
+    if session is None:
+        session = configure_session(HTTP_POOL_SIZE)
+    return session
+
+
+def session_stats(session: Optional[requests.Session] = None) -> Dict[str, int]:
+    """
+    Connection reuse counters of `session` (default: the shared one), summed over its
+    urllib3 pools: requests sent, connections opened, and requests served on a reused
+    connection.
+    """
+    requests_sent = 0
+    connections = 0
+    if session is None:
+        session = _session
+    if session is not None:
+        # http:// 与 https:// 挂的是同一个 adapter，避免重复计数
+        adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                requests_sent += pool.num_requests
+                connections += pool.num_connections
+    return {
+        "requests": requests_sent,
+        "connections": connections,
+        "reused": max(0, requests_sent - connections),
+    }
+
+
+# ======================
+# 多端点路由（最少在途请求 + 失败摘除）
+# ======================
+
+@dataclass
+class Endpoint:
+    base: str
+    max_concurrency: int
+    outstanding: int = 0
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+    requests: int = 0
+    failures: int = 0
+    ejections: int = 0
+    lines: int = 0
+    busy_seconds: float = 0.0
+
+    @property
+    def url(self) -> str:
+        return self.base.rstrip("/") + "/v1/chat/completions"
+
+
+class EndpointRouter:
+    """
+    Thread-safe picker over the configured endpoints. Each request goes to the healthy
+    endpoint with the fewest outstanding requests relative to its cap. An endpoint that
+    fails ENDPOINT_EJECT_AFTER times in a row is skipped for ENDPOINT_COOLDOWN seconds.
+    After that one more failure ejects it again.
+    """
+
+    def __init__(self, endpoints: Sequence[Tuple[str, int]]) -> None:
+        self.endpoints = [Endpoint(base, max(1, cap)) for base, cap in endpoints]
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+
+    @property
+    def capacity(self) -> int:
+        return sum(endpoint.max_concurrency for endpoint in self.endpoints)
+
+    def try_acquire(self) -> Tuple[Optional[Endpoint], float]:
+        """Return (endpoint, 0) or (None, seconds worth waiting before trying again)."""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.ejected_until <= now]
+            free = [endpoint for endpoint in healthy if endpoint.outstanding < endpoint.max_concurrency]
+            if free:
+                endpoint = min(free, key=lambda e: (e.outstanding / e.max_concurrency, e.outstanding))
+                endpoint.outstanding += 1
+                endpoint.requests += 1
+                return endpoint, 0.0
+            if healthy:
+                return None, 0.02
+            # 全部被摘除：等最早的那个冷却结束
+            return None, max(0.02, min(endpoint.ejected_until for endpoint in self.endpoints) - now)
+
+    async def acquire(self) -> Endpoint:
+        while True:
+            endpoint, delay = self.try_acquire()
+            if endpoint is not None:
+                return endpoint
+            await asyncio.sleep(delay)
+
+    def abandon(self, endpoint: Endpoint, elapsed: float) -> None:
+        """Release a request that was cancelled by the caller; it says nothing about the endpoint's health."""
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.busy_seconds += elapsed
+
+    def release(self, endpoint: Endpoint, ok: bool, elapsed: float, lines: int = 0) -> None:
+        ejected = False
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.busy_seconds += elapsed
+            endpoint.lines += lines
+            if ok:
+                endpoint.consecutive_failures = 0
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= ENDPOINT_EJECT_AFTER and len(self.endpoints) > 1:
+                endpoint.ejected_until = time.monotonic() + ENDPOINT_COOLDOWN
+                endpoint.consecutive_failures = ENDPOINT_EJECT_AFTER - 1
+                endpoint.ejections += 1
+                ejected = True
+        if ejected:
+            emit_line(f"[ENDPOINT] ejected {endpoint.base} for {ENDPOINT_COOLDOWN:.0f}s after repeated failures")
+
+    def summary_lines(self) -> List[str]:
+        wall = max(time.monotonic() - self.started, 1e-6)
+        with self._lock:
+            return [
+                f"[ENDPOINT] {e.base} requests={e.requests} failed={e.failures} ejected={e.ejections} "
+                f"lines={e.lines} lines/s={e.lines / wall:.1f} busy={e.busy_seconds:.1f}s"
+                for e in self.endpoints
+            ]
+
+
+_router: Optional[EndpointRouter] = None
+
+
+def configure_router(max_in_flight: int = MAX_IN_FLIGHT_BATCHES) -> EndpointRouter:
+    """
+    Build a fresh router (and zeroed stats) from API_ENDPOINTS, or from API_BASE capped
+    at `max_in_flight` if that is empty.
+    """
+    global _router
+    _router = EndpointRouter(API_ENDPOINTS or [(API_BASE, max_in_flight)])
+    return _router
+
+
+def get_router() -> EndpointRouter:
+    router = _router
+    if router is None:
+        router = configure_router()
+    return router
+
+
+class PromptCacheStats:
+    """
+    Prompt-processing counters collected from responses: `usage.prompt_tokens_details.
+    cached_tokens` (OpenAI/vLLM) and llama.cpp `timings` (prompt_n, prompt_ms, cache_n).
+    Time saved is estimated as reused tokens times the measured per-token prompt cost.
+    Streams closed early never receive their final usage event; they are only counted
+    as `unreported`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.unreported = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.prompt_ms = 0.0
+        self.saved_ms = 0.0
+
+    def record(self, data: object) -> None:
+        if not isinstance(data, dict):
+            return
+        usage = data.get("usage") or {}
+        timings = data.get("timings") or {}
+        if not usage and not timings:
+            return
+        details = usage.get("prompt_tokens_details") or {}
+        processed = int(timings.get("prompt_n") or 0)
+        cached = int(details.get("cached_tokens") or timings.get("cache_n") or 0)
+        prompt_ms = float(timings.get("prompt_ms") or 0.0)
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += int(usage.get("prompt_tokens") or processed + cached)
+            self.cached_tokens += cached
+            self.prompt_ms += prompt_ms
+            if processed:
+                self.saved_ms += cached * prompt_ms / processed
+
+    def record_unreported(self) -> None:
+        with self._lock:
+            self.unreported += 1
+
+    def summary(self) -> Optional[str]:
+        with self._lock:
+            if not self.requests and not self.unreported:
+                return None
+            ratio = self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+            per_request = self.saved_ms / self.requests if self.requests else 0.0
+            line = (
+                f"[PROMPT] requests={self.requests} prompt_tokens={self.prompt_tokens} "
+                f"cached={self.cached_tokens} ({ratio:.1%}) prompt_ms={self.prompt_ms:.0f} "
+                f"saved_ms={self.saved_ms:.0f} per_request={per_request:.1f}"
+            )
+            if self.unreported:
+                line += f" unreported={self.unreported}"
+            return line
+
+
+_prompt_stats = PromptCacheStats()
+
+
+def reset_prompt_stats() -> PromptCacheStats:
+    global _prompt_stats
+    _prompt_stats = PromptCacheStats()
+    return _prompt_stats
+
+
+@dataclass
+class TranslationContext:
+    """
+    Per-call state of one `translate_file_async`: its HTTP session, endpoint router,
+    prompt-cache counters and request thread pool. Calls running at the same time each
+    use their own, so neither their pools nor their [HTTP]/[PROMPT]/[ENDPOINT] numbers mix.
+    """
+
+    session: requests.Session
+    router: EndpointRouter
+    prompt_stats: PromptCacheStats
+    executor: Optional[ThreadPoolExecutor] = None  # None：事件循环的默认线程池
+
+
+# 当前 asyncio 任务所属的翻译上下文；任务创建时继承，所以各 batch 自动拿到所属文件的上下文
+_current_context: ContextVar[Optional[TranslationContext]] = ContextVar("translation_context", default=None)
+
+
+def _context() -> TranslationContext:
+    """The running file's context, or one over the module-level session/router/stats for standalone calls."""
+    context = _current_context.get()
+    if context is None:
+        context = TranslationContext(session=get_session(), router=get_router(), prompt_stats=_prompt_stats)
+    return context
+
+
+def _chat_request(
+    system_prompt: str,
+    user_content: str,
+    max_tokens: int,
+    stream: bool = False,
+) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Serialize the request once; the body is reused across retries and endpoints.
+    What a server can reuse is decided by the prompt it renders from `messages`: the
+    fixed system prompt comes first, so consecutive batches share it as a prefix.
+    """
+    payload: Dict[str, object] = {
         "model": MODEL_NAME,
-        "temperature": TEMPERATURE,
-        "max_tokens": max_tokens,
         "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_content},
         ],
+        "temperature": TEMPERATURE,
+        "max_tokens": max_tokens,
     }
+    if PROMPT_CACHE_ENABLED:
+        payload["cache_prompt"] = True
+    if stream:
+        payload["stream"] = True
+        # 流式响应默认不带 usage，需要显式要求
+        payload["stream_options"] = {"include_usage": True}
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
     headers = {
         "Authorization": f"Bearer {API_KEY}",
         "Content-Type": "application/json",
     }
+    return body, headers
+
+
+def _message_content(data: object) -> str:
+    try:
+        content = data["choices"][0]["message"]["content"]  # type: ignore[index]
+    except (KeyError, IndexError, TypeError) as exc:
+        raise TranslationError(f"Unexpected API response shape: {data}") from exc
+    return (content or "").strip()
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter, so batches that failed together do not retry in lockstep."""
+    delay = RETRY_BACKOFF_BASE * (2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class _RequestHandle:
+    """
+    Lets the event loop abort a request that runs in a worker thread. Once the response
+    headers are in, `abort` shuts the socket down: the thread fails on its next read and
+    the connection is dropped. A request still waiting for its headers cannot be
+    interrupted; the per-read TIMEOUT of requests ends it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._resp: Optional[requests.Response] = None
+        self.aborted = False
+
+    def attach(self, resp: requests.Response) -> None:
+        with self._lock:
+            self._resp = resp
+            aborted = self.aborted
+        if aborted:
+            raise TranslationError("request abandoned after BATCH_TIMEOUT")
+
+    def abort(self) -> None:
+        with self._lock:
+            self.aborted = True
+            resp = self._resp
+        if resp is None:
+            return
+        # 另一个线程正阻塞在读上，直接 close 会等它读完；shutdown 能立刻打断
+        sock = getattr(getattr(resp.raw, "connection", None), "sock", None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def _post_chat(
+    context: TranslationContext,
+    url: str,
+    body: bytes,
+    headers: Dict[str, str],
+    handle: _RequestHandle,
+) -> str:
+    # stream=True 只是为了在读响应体之前拿到 response，超时时可以中断
+    with context.session.post(url, data=body, headers=headers, timeout=TIMEOUT, stream=True) as resp:
+        handle.attach(resp)
+        resp.raise_for_status()
+        data = resp.json()
+    context.prompt_stats.record(data)
+    return _message_content(data)
+
+
+def _stream_deltas(resp: requests.Response, prompt_stats: PromptCacheStats):
+    """Yield the content deltas of an SSE chat completion stream."""
+    for raw in resp.iter_lines(chunk_size=None):
+        if not raw or not raw.startswith(b"data:"):
+            continue
+        data = raw[5:].strip()
+        if data == b"[DONE]":
+            return
+        try:
+            event = json.loads(data)
+            prompt_stats.record(event)
+            choices = event["choices"]
+            # include_usage 时最后一个事件只带 usage，choices 为空
+            delta = (choices[0].get("delta") or {}) if choices else {}
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as exc:
+            raise TranslationError(f"Unexpected stream event: {data[:200]!r}") from exc
+        content = delta.get("content")
+        if content:
+            yield content
+
+
+def _post_chat_stream(
+    context: TranslationContext,
+    url: str,
+    body: bytes,
+    headers: Dict[str, str],
+    on_line: Callable[[str], bool],
+    handle: _RequestHandle,
+) -> None:
+    # 提前 return 时关闭连接，服务端随之停止生成
+    with context.session.post(url, data=body, headers=headers, timeout=TIMEOUT, stream=True) as resp:
+        handle.attach(resp)
+        resp.raise_for_status()
+        if "text/event-stream" not in resp.headers.get("Content-Type", ""):
+            data = resp.json()
+            context.prompt_stats.record(data)
+            for line in _message_content(data).splitlines():
+                if not on_line(line):
+                    return
+            return
+
+        pending = ""
+        for delta in _stream_deltas(resp, context.prompt_stats):
+            pending += delta
+            *complete, pending = pending.split("\n")
+            for line in complete:
+                if not on_line(line):
+                    # 提前断开就收不到最后的 usage 事件，[PROMPT] 里单独计数
+                    context.prompt_stats.record_unreported()
+                    return
+        if pending:
+            on_line(pending)
+
+
+class _LineGate:
+    """
+    Forward streamed lines to `on_line` until closed, so lines a worker thread has already
+    read can no longer be committed once their request was abandoned.
+    """
+
+    def __init__(self, on_line: Callable[[str], bool]) -> None:
+        self._on_line = on_line
+        self._lock = threading.Lock()
+        self._closed = False
+        self.lines = 0
+
+    def feed(self, line: str) -> bool:
+        with self._lock:
+            if self._closed:
+                return False
+            self.lines += 1
+            return self._on_line(line)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+
+
+_T = TypeVar("_T")
+
+
+async def _run_request(context: TranslationContext, func: Callable[..., _T], *args: object) -> _T:
+    """
+    Run a blocking request (`func(context, *args, handle)`) on the context's thread pool.
+    After BATCH_TIMEOUT, or when the calling task is cancelled, the request is aborted.
+    """
+    handle = _RequestHandle()
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(context.executor, func, context, *args, handle),
+            BATCH_TIMEOUT,
+        )
+    except (TimeoutError, asyncio.CancelledError):
+        handle.abort()
+        raise
+
+
+async def call_chat_completions_async(system_prompt: str, user_content: str, max_tokens: int) -> str:
+    body, headers = _chat_request(system_prompt, user_content, max_tokens)
+    context = _context()
+    router = context.router
 
     last_exc: Optional[Exception] = None
     for attempt in range(1, MAX_RETRIES + 1):
+        # 每次重试都重新选端点，失败的那台自然会被绕开
+        endpoint = await router.acquire()
+        started = time.monotonic()
+        content: Optional[str] = None
+        ok: Optional[bool] = None  # 保持 None：被取消（别的 batch 出错），不算这个端点的失败
         try:
-            resp = requests.post(url, json=payload, headers=headers, timeout=TIMEOUT)
-            resp.raise_for_status()
-            data = resp.json()
-            try:
-                content = data["choices"][0]["message"]["content"]
-            except (KeyError, IndexError, TypeError) as exc:
-                raise TranslationError(f"Unexpected API response shape: {data}") from exc
-            return (content or "").strip()
-        except (requests.RequestException, TranslationError) as exc:
+            # requests 是同步库：放到线程里执行，超时由事件循环控制
+            content = await _run_request(context, _post_chat, endpoint.url, body, headers)
+            ok = True
+            return content
+        except (requests.RequestException, TranslationError, TimeoutError) as exc:
             last_exc = exc
-            if attempt < MAX_RETRIES:
-                time.sleep(RETRY_BACKOFF_BASE * (2 ** (attempt - 1)))
-                continue
-            raise TranslationError(f"API call failed after retries: {exc}") from exc
+            ok = False
+        finally:
+            if ok is None:
+                router.abandon(endpoint, time.monotonic() - started)
+            else:
+                lines = len(content.splitlines()) if content else 0
+                router.release(endpoint, ok, time.monotonic() - started, lines)
+        if attempt < MAX_RETRIES:
+            await asyncio.sleep(_retry_delay(attempt))
+            continue
+        raise TranslationError(f"API call failed after retries: {last_exc!r}") from last_exc
 
     raise TranslationError(f"API call failed: {last_exc}")
 
 
+async def stream_chat_completions_async(
+    system_prompt: str,
+    user_content: str,
+    max_tokens: int,
+    on_line: Callable[[str], bool],
+) -> None:
+    """
+    `call_chat_completions_async` with `stream: true`: each output line is passed to
+    `on_line` as soon as it is complete, and the stream is closed early when `on_line`
+    returns False. A server that ignores `stream` and answers with plain JSON is handled
+    the same way. Retries only happen while no line has been delivered yet.
+    """
+    body, headers = _chat_request(system_prompt, user_content, max_tokens, stream=True)
+    context = _context()
+    router = context.router
+
+    last_exc: Optional[Exception] = None
+    for attempt in range(1, MAX_RETRIES + 1):
+        endpoint = await router.acquire()
+        started = time.monotonic()
+        gate = _LineGate(on_line)
+        ok: Optional[bool] = None  # 保持 None：被取消（别的 batch 出错），不算这个端点的失败
+        try:
+            await _run_request(context, _post_chat_stream, endpoint.url, body, headers, gate.feed)
+            ok = True
+            return
+        except (requests.RequestException, TranslationError, ValueError, TimeoutError) as exc:
+            last_exc = exc
+            ok = False
+        finally:
+            gate.close()
+            if ok is None:
+                router.abandon(endpoint, time.monotonic() - started)
+            else:
+                router.release(endpoint, ok, time.monotonic() - started, gate.lines)
+        if not gate.lines and attempt < MAX_RETRIES:
+            await asyncio.sleep(_retry_delay(attempt))
+            continue
+        raise TranslationError(f"API stream failed: {last_exc!r}") from last_exc
+
+    raise TranslationError(f"API stream failed: {last_exc}")
+
+
+def call_chat_completions(system_prompt: str, user_content: str, max_tokens: int) -> str:
+    return asyncio.run(call_chat_completions_async(system_prompt, user_content, max_tokens))
+
+
 # ======================
 # 翻译逻辑：batch 主路径 + 逐行兜底
 # ======================
@@ -209,18 +1020,83 @@ def should_skip_line(line: str) -> bool:
     return False
 
 
-def translate_line(line: str) -> str:
+async def translate_line_async(line: str) -> str:
     if should_skip_line(line):
         return line
-    out = call_chat_completions(SYSTEM_PROMPT_LINE, line, MAX_TOKENS_LINE)
+    out = await call_chat_completions_async(SYSTEM_PROMPT_LINE, line, MAX_TOKENS_LINE)
     return out if out else line
 
 
-def translate_batch(lines: List[str]) -> List[str]:
+def translate_line(line: str) -> str:
+    return asyncio.run(translate_line_async(line))
+
+
+def parse_tagged_output(raw_out: str, count: int) -> Dict[int, str]:
     """
-    Batch translate N lines using line tags, ensuring a reliable split back.
-    Input:  ["原文1", "原文2", ...]
-    Output: ["译文1", "译文2", ...]
+    Map 0-based line index -> translation for every well-formed tagged line.
+    Untagged, out-of-range, empty or duplicated tags are left out.
+    """
+    results: Dict[int, str] = {}
+    duplicated = set()
+    for raw_line in raw_out.splitlines():
+        match = LINE_TAG_RE.match(raw_line.strip())
+        if not match:
+            continue
+        idx = int(match.group(1)) - 1
+        text = match.group(2).strip()
+        if not 0 <= idx < count or not text:
+            continue
+        if idx in results:
+            duplicated.add(idx)
+            continue
+        results[idx] = text
+    # 同一标签出现多次时无法判断哪条可信，整行重译
+    for idx in duplicated:
+        results.pop(idx, None)
+    return results
+
+
+class TaggedLineStream:
+    """
+    Incremental `parse_tagged_output` for a streamed batch. Each well-formed tagged line
+    is committed through `on_partial` as soon as it arrives; a repeated tag keeps the first
+    copy. `feed` returns False to stop the stream once every line is in, or once the output
+    has clearly left the tag sequence (STREAM_ABORT_AFTER untagged, out-of-range or
+    repeated lines).
+    """
+
+    def __init__(self, count: int, on_partial: Optional[Callable[[Dict[int, str]], None]] = None) -> None:
+        self.count = count
+        self.on_partial = on_partial
+        self.results: Dict[int, str] = {}
+        self.anomalies = 0
+
+    def feed(self, raw_line: str) -> bool:
+        text = raw_line.strip()
+        if not text:
+            return True
+        match = LINE_TAG_RE.match(text)
+        if match:
+            idx = int(match.group(1)) - 1
+            out = match.group(2).strip()
+            # 重复标签只保留先到的那条（已经提交），按异常行计数
+            if 0 <= idx < self.count and out and idx not in self.results:
+                self.results[idx] = out
+                if self.on_partial:
+                    self.on_partial({idx: out})
+                return len(self.results) < self.count
+        self.anomalies += 1
+        return self.anomalies < STREAM_ABORT_AFTER
+
+
+async def translate_batch_partial_async(
+    lines: List[str],
+    on_partial: Optional[Callable[[Dict[int, str]], None]] = None,
+) -> Dict[int, str]:
+    """
+    Batch translate N lines using line tags and keep whatever came back correctly tagged.
+    Returns {index in `lines`: 译文}; missing indices need to be requested again.
+    `on_partial` receives lines as they are committed (one at a time when streaming).
     """
     # 只对需要翻译的行做 batch（caller 保证）
     tagged_in = []
@@ -228,25 +1104,230 @@ def translate_batch(lines: List[str]) -> List[str]:
         tagged_in.append(f"{LINE_TAG_FMT.format(i)} {line}")
     user_content = "\n".join(tagged_in)
 
-    raw_out = call_chat_completions(SYSTEM_PROMPT_BATCH, user_content, MAX_TOKENS_BATCH)
-    out_lines = [ln.strip() for ln in raw_out.splitlines() if ln.strip()]
+    if not STREAM_ENABLED:
+        raw_out = await call_chat_completions_async(SYSTEM_PROMPT_BATCH, user_content, MAX_TOKENS_BATCH)
+        results = parse_tagged_output(raw_out, len(lines))
+        if on_partial and results:
+            on_partial(results)
+        return results
 
-    # 校验：行数必须一致
-    if len(out_lines) != len(lines):
-        raise TranslationError(f"Batch line count mismatch: in={len(lines)} out={len(out_lines)}")
+    stream = TaggedLineStream(len(lines), on_partial)
+    try:
+        await stream_chat_completions_async(SYSTEM_PROMPT_BATCH, user_content, MAX_TOKENS_BATCH, stream.feed)
+    except TranslationError:
+        # 流中途断开：已提交的行照常保留，其余交给兜底
+        if not stream.results:
+            raise
+    return stream.results
 
-    results: List[str] = []
-    for i, out in enumerate(out_lines, start=1):
-        prefix = LINE_TAG_FMT.format(i)
-        if not out.startswith(prefix):
-            raise TranslationError(f"Batch tag mismatch on line {i}: got={out[:20]!r}")
-        results.append(out[len(prefix):].strip() or lines[i - 1])
 
-    return results
+def translate_batch_partial(
+    lines: List[str],
+    on_partial: Optional[Callable[[Dict[int, str]], None]] = None,
+) -> Dict[int, str]:
+    return asyncio.run(translate_batch_partial_async(lines, on_partial))
+
+
+def translate_batch(lines: List[str]) -> List[str]:
+    """
+    Batch translate N lines using line tags, ensuring a reliable split back.
+    Input:  ["原文1", "原文2", ...]
+    Output: ["译文1", "译文2", ...]
+    """
+    results = translate_batch_partial(lines)
+    missing = [i for i in range(len(lines)) if i not in results]
+    if missing:
+        raise TranslationError(f"Batch tag mismatch: {len(missing)}/{len(lines)} lines missing or malformed")
+    return [results[i] for i in range(len(lines))]
+
+
+def _committer(
+    indices: Sequence[int],
+    on_done: Callable[[Dict[int, str]], None],
+    result: ChunkResult,
+) -> Callable[[Dict[int, str]], None]:
+    """Map lines committed by a (sub-)request back to batch-local indices and report them."""
+
+    def commit(partial: Dict[int, str]) -> None:
+        finished = {indices[local_idx]: out for local_idx, out in partial.items()}
+        for idx, out in finished.items():
+            result.lines[idx] = out
+        on_done(finished)
+
+    return commit
+
+
+async def _recover_missing(
+    lines: List[str],
+    indices: List[int],
+    on_done: Callable[[Dict[int, str]], None],
+    result: ChunkResult,
+) -> None:
+    """
+    Re-request only the `indices` of `lines` that are still untranslated.
+    Correctly tagged lines are kept each round; if a round salvages nothing the
+    set is halved, down to single lines, so a bad line costs O(log n) requests.
+    """
+    if len(indices) == 1:
+        idx = indices[0]
+        result.requests += 1
+        result.fallback_requests += 1
+        _committer(indices, on_done, result)({0: await translate_line_async(lines[idx])})
+        return
+
+    result.requests += 1
+    result.fallback_requests += 1
+    try:
+        salvaged = await translate_batch_partial_async(
+            [lines[idx] for idx in indices], _committer(indices, on_done, result)
+        )
+    except Exception:
+        salvaged = {}
+
+    missing = [idx for local_idx, idx in enumerate(indices) if local_idx not in salvaged]
+    if not missing:
+        return
+    if salvaged:
+        await _recover_missing(lines, missing, on_done, result)
+        return
+    mid = len(missing) // 2
+    await _recover_missing(lines, missing[:mid], on_done, result)
+    await _recover_missing(lines, missing[mid:], on_done, result)
+
+
+async def translate_chunk_async(lines: List[str], on_done: Callable[[Dict[int, str]], None]) -> ChunkResult:
+    """
+    Translate one batch, keeping every correctly tagged line and re-requesting
+    only the missing/malformed ones (see `_recover_missing`).
+    `on_done({index: 译文})` is called with batch-local indices as lines finish.
+    """
+    result = ChunkResult(lines=[""] * len(lines), requests=1)
+    try:
+        salvaged = await translate_batch_partial_async(lines, _committer(range(len(lines)), on_done, result))
+    except Exception:
+        salvaged = {}
+
+    result.first_pass = len(salvaged)
+
+    missing = [idx for idx in range(len(lines)) if idx not in salvaged]
+    if not missing:
+        return result
+    if salvaged or len(missing) == 1:
+        await _recover_missing(lines, missing, on_done, result)
+    else:
+        mid = len(missing) // 2
+        await _recover_missing(lines, missing[:mid], on_done, result)
+        await _recover_missing(lines, missing[mid:], on_done, result)
+    return result
+
+
+def translate_chunk(lines: List[str], on_done: Callable[[Dict[int, str]], None]) -> ChunkResult:
+    return asyncio.run(translate_chunk_async(lines, on_done))
+
+
+def estimate_tokens(line: str) -> int:
+    """Rough output-token estimate for one tagged line (CJK ~1 token/char, others ~4 chars/token)."""
+    cjk = sum(1 for ch in line if ord(ch) >= 0x2E80)
+    other = len(line) - cjk
+    return 4 + cjk + (other + 3) // 4
+
 
+class AdaptiveBatcher:
+    """
+    Decide how many pending lines go into the next batch.
+    Lines are packed up to `token_budget` estimated tokens and at most `size` lines;
+    `size` grows after a streak of clean batches and halves when the moving average of
+    first-pass success drops below BATCH_SHRINK_BELOW.
+    """
 
-def translate_file(input_path: str) -> str:
+    def __init__(
+        self,
+        initial_size: int = BATCH_SIZE,
+        min_size: int = BATCH_SIZE_MIN,
+        max_size: int = BATCH_SIZE_MAX,
+        token_budget: int = BATCH_TOKEN_BUDGET,
+        adaptive: bool = ADAPTIVE_BATCHING,
+    ) -> None:
+        self.adaptive = adaptive
+        self.min_size = max(1, min(min_size, initial_size))
+        self.max_size = max(initial_size, max_size)
+        self.size = max(1, initial_size)
+        self.token_budget = token_budget
+        self.sizes: List[int] = []
+        self.success_rate = 1.0
+        self._streak = 0
+
+    def next_batch(self, lines: Sequence[str], start: int) -> int:
+        """Return how many of `lines[start:]` to put into the next batch (at least 1)."""
+        if not self.adaptive:
+            count = min(self.size, len(lines) - start)
+            self.sizes.append(count)
+            return count
+
+        count = 0
+        tokens = 0
+        while start + count < len(lines) and count < self.size:
+            cost = estimate_tokens(lines[start + count])
+            if count and tokens + cost > self.token_budget:
+                break
+            tokens += cost
+            count += 1
+        self.sizes.append(count)
+        return count
+
+    def record(self, result: ChunkResult) -> None:
+        if not self.adaptive:
+            return
+        total = len(result.lines)
+        if not total:
+            return
+        ratio = result.first_pass / total
+        self.success_rate = 0.7 * self.success_rate + 0.3 * ratio
+        if ratio < 1.0:
+            self._streak = 0
+            if self.success_rate < BATCH_SHRINK_BELOW:
+                self._resize(max(self.min_size, self.size // 2), f"mismatch, success={self.success_rate:.0%}")
+                # 缩小后重新起算，避免连续几个在途 batch 把 size 一路压到底
+                self.success_rate = 1.0
+            return
+        self._streak += 1
+        if self._streak >= BATCH_GROW_AFTER:
+            self._streak = 0
+            self._resize(min(self.max_size, self.size + max(1, self.size // 4)), "stable")
+
+    def _resize(self, new_size: int, reason: str) -> None:
+        if new_size == self.size:
+            return
+        emit_line(f"[BATCH] size {self.size} -> {new_size} ({reason})")
+        self.size = new_size
+
+    def summary(self) -> str:
+        if not self.sizes:
+            return "batches=0"
+        avg = sum(self.sizes) / len(self.sizes)
+        return (
+            f"batches={len(self.sizes)} avg={avg:.1f} min={min(self.sizes)} "
+            f"max={max(self.sizes)} final_limit={self.size}"
+        )
+
+
+async def translate_file_async(
+    input_path: str,
+    concurrency: Optional[int] = None,
+    memory: Optional[TranslationMemory] = None,
+) -> str:
+    """
+    Translate `input_path` in place. Batches are sized by AdaptiveBatcher as slots free
+    up; at most `concurrency` batch requests are in flight (an asyncio.Semaphore).
+    A `memory` passed in is used as is and left open for the caller (the worker keeps
+    one for its whole lifetime); otherwise one is opened for this file. Requests go
+    through a TranslationContext of this call (own session, router, prompt stats and a
+    thread pool of `concurrency` threads), so concurrent calls do not interfere.
+    """
     entries = read_srt(input_path)
+    router = EndpointRouter(API_ENDPOINTS or [(API_BASE, concurrency or MAX_IN_FLIGHT_BATCHES)])
+    # 未指定并发时：单端点用 MAX_IN_FLIGHT_BATCHES，多端点把所有端点的并发上限用满
+    max_in_flight = max(1, concurrency or router.capacity)
 
     # 收集需要翻译的位置
     positions: List[Tuple[int, int]] = []  # (entry_idx, line_idx)
@@ -262,26 +1343,153 @@ def translate_file(input_path: str) -> str:
     total_lines = len(source_lines)
     translated_lines: List[str] = [""] * total_lines
 
+    # 文件内去重：同一句（规范化后）只翻译一次，结果回填到所有出现位置
+    unique_lines: List[str] = []
+    occurrences: List[List[int]] = []  # unique idx -> source_lines 中的位置
+    unique_index: Dict[str, int] = {}
+    for idx, line in enumerate(source_lines):
+        key = normalize_source_line(line)
+        u_idx = unique_index.get(key)
+        if u_idx is None:
+            u_idx = unique_index[key] = len(unique_lines)
+            unique_lines.append(line)
+            occurrences.append([])
+        occurrences[u_idx].append(idx)
+
+    def fill(u_idx: int, out: str) -> None:
+        for idx in occurrences[u_idx]:
+            translated_lines[idx] = out
+
+    # 断点续译：上次中断前已完成的行直接回填
+    checkpoint = TranslationCheckpoint(input_path, source_lines) if CHECKPOINT_ENABLED else None
+    restored = checkpoint.load() if checkpoint else {}
+    if checkpoint:
+        checkpoint.start(resumed=bool(restored))
+
+    # 先查翻译记忆，只把未命中的行送去模型
+    owns_memory = memory is None
+    if owns_memory:
+        memory = open_translation_memory()
+    hits_before = memory.hits if memory else 0
+    misses_before = memory.misses if memory else 0
+    pending: List[int] = []
+    resumed_lines = 0
+    for u_idx, line in enumerate(unique_lines):
+        first_pos = occurrences[u_idx][0]
+        if first_pos in restored:
+            fill(u_idx, restored[first_pos])
+            resumed_lines += len(occurrences[u_idx])
+            continue
+        cached = memory.get(line) if memory else None
+        if cached is None:
+            pending.append(u_idx)
+        else:
+            fill(u_idx, cached)
+
     def emit_progress(done: int, total: int) -> None:
-        print(f"[PROGRESS] {done}/{total}", flush=True)
+        emit_line(f"[PROGRESS] {done}/{total}")
+
+    # 多个 batch 并发完成时，计数与输出在同一把锁内，保证进度单调递增
+    progress_lock = threading.Lock()
+    done = total_lines - sum(len(occurrences[u_idx]) for u_idx in pending)
+
+    def tracker(batch_idx: List[int]) -> Callable[[Dict[int, str]], None]:
+        # 每行一完成就写入 translated_lines 和断点文件，流式时逐行推进进度
+        def advance(finished: Dict[int, str]) -> None:
+            nonlocal done
+            with progress_lock:
+                for j, out in finished.items():
+                    fill(batch_idx[j], out)
+                    done += len(occurrences[batch_idx[j]])
+                if checkpoint:
+                    checkpoint.append([(pos, finished[j]) for j in finished for pos in occurrences[batch_idx[j]]])
+                emit_progress(done, total_lines)
 
-    emit_progress(0, total_lines)
-    done = 0
-    i = 0
-    while i < total_lines:
-        batch_src = source_lines[i:i + BATCH_SIZE]
+        return advance
+
+    if total_lines:
+        ratio = len(unique_lines) / total_lines
+        emit_line(f"[DEDUP] unique={len(unique_lines)} total={total_lines} ratio={ratio:.1%}")
+    if resumed_lines:
+        emit_line(f"[RESUME] restored={resumed_lines}/{total_lines} from {checkpoint.path}")
+    emit_progress(done, total_lines)
+    failed_batches = 0
+    fallback_requests = 0
+    batcher = AdaptiveBatcher()
+    pending_src = [unique_lines[u_idx] for u_idx in pending]
+    slots = asyncio.Semaphore(max_in_flight)
+    errors: List[BaseException] = []
+
+    async def run_batch(batch_idx: List[int], batch_src: List[str]) -> None:
+        nonlocal failed_batches, fallback_requests
         try:
-            batch_out = translate_batch(batch_src)
-            translated_lines[i:i + BATCH_SIZE] = batch_out
-            done += len(batch_out)
-            emit_progress(done, total_lines)
-        except Exception:
-            # 兜底：逐行翻译
-            for j, line in enumerate(batch_src):
-                translated_lines[i + j] = translate_line(line)
-                done += 1
-                emit_progress(done, total_lines)
-        i += BATCH_SIZE
+            chunk = await translate_chunk_async(batch_src, tracker(batch_idx))
+        except Exception as exc:
+            errors.append(exc)
+            raise
+        finally:
+            slots.release()
+        batcher.record(chunk)
+        if chunk.fallback_requests:
+            failed_batches += 1
+            fallback_requests += chunk.fallback_requests
+        # 译文与断点已由 tracker 逐行写入；翻译记忆在事件循环线程里按 batch 写
+        if memory:
+            memory.put_many(list(zip(batch_src, chunk.lines)))
+
+    context = TranslationContext(
+        session=new_session(max(max_in_flight, HTTP_POOL_SIZE), hosts=len(router.endpoints)),
+        router=router,
+        prompt_stats=PromptCacheStats(),
+        # 每个在途 batch 同一时刻只有一个请求，线程数与并发数一致；默认线程池只有 cpu_count+4 个线程
+        executor=ThreadPoolExecutor(max_in_flight, thread_name_prefix="translate"),
+    )
+    # 之后创建的 batch 任务都继承这个上下文
+    context_token = _current_context.set(context)
+    tasks: List[asyncio.Task[None]] = []
+    try:
+        next_pending = 0
+        try:
+            while next_pending < len(pending):
+                # 等到有空位再决定下一个 batch 的大小，让 batcher 用上最新的反馈
+                await slots.acquire()
+                if errors:
+                    slots.release()
+                    break
+                count = batcher.next_batch(pending_src, next_pending)
+                batch_idx = pending[next_pending:next_pending + count]
+                batch_src = pending_src[next_pending:next_pending + count]
+                tasks.append(asyncio.create_task(run_batch(batch_idx, batch_src)))
+                next_pending += len(batch_idx)
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    finally:
+        _current_context.reset(context_token)
+        # 被中断的请求已在 _run_request 里 abort；仍在等响应头的线程不必等它
+        context.executor.shutdown(wait=False)
+        if batcher.sizes:
+            emit_line(f"[BATCH] {batcher.summary()}")
+        if failed_batches:
+            emit_line(f"[FALLBACK] batches={failed_batches} requests={fallback_requests}")
+        if memory:
+            emit_line(f"[CACHE] hits={memory.hits - hits_before} misses={memory.misses - misses_before}")
+            if owns_memory:
+                memory.close()
+        if checkpoint:
+            checkpoint.close()
+        http = session_stats(context.session)
+        context.session.close()
+        emit_line(f"[HTTP] requests={http['requests']} connections={http['connections']}")
+        if API_ENDPOINTS:
+            for line in router.summary_lines():
+                emit_line(line)
+        prompt_summary = context.prompt_stats.summary()
+        if prompt_summary:
+            emit_line(prompt_summary)
 
     # 写回 entries
     for (e_idx, l_idx), out in zip(positions, translated_lines):
@@ -300,18 +1508,90 @@ def translate_file(input_path: str) -> str:
             raise OSError(f"Failed to remove original subtitle: {original_path}") from exc
 
     os.replace(translated_path, original_path)
+    if checkpoint:
+        checkpoint.remove()
     return original_path
 
 
+def translate_file(
+    input_path: str,
+    concurrency: Optional[int] = None,
+    memory: Optional[TranslationMemory] = None,
+) -> str:
+    return asyncio.run(translate_file_async(input_path, concurrency, memory))
+
+
+def run_worker(concurrency: Optional[int] = None) -> int:
+    """
+    Long-lived worker: read SRT paths from stdin (one per line, UTF-8) and translate
+    them one at a time, reporting [JOB START]/[JOB DONE]/[JOB FAILED] per path.
+    The translation memory stays open across jobs. Exits when stdin is closed.
+    """
+    # 控制器按 UTF-8 解码输出；Windows 下管道默认是本地代码页
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+    emit_line("[WORKER] ready")
+    memory: Optional[TranslationMemory] = None
+    try:
+        for raw in sys.stdin.buffer:
+            input_path = raw.decode("utf-8", errors="replace").strip()
+            if not input_path:
+                continue
+            emit_line(f"[JOB START] {input_path}")
+            # 上一个任务里数据库出错被停用的话，换个新连接再试
+            if memory is None or memory.failed:
+                if memory is not None:
+                    memory.close()
+                memory = open_translation_memory()
+            try:
+                output_path = translate_file(input_path, concurrency=concurrency, memory=memory)
+            except (OSError, ValueError, TranslationError, requests.RequestException) as exc:
+                emit_line(f"[ERROR] {exc}")
+                emit_line(f"[JOB FAILED] {input_path}")
+                continue
+            emit_line(f"Saved translated subtitles to {output_path}")
+            emit_line(f"[JOB DONE] {input_path}")
+    finally:
+        if memory is not None:
+            memory.close()
+    return 0
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Translate an SRT subtitle file (Japanese -> Simplified Chinese).")
+    parser.add_argument("input", nargs="?", help="Input .srt path.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help=(
+            f"Number of batches in flight at once "
+            f"(default: {MAX_IN_FLIGHT_BATCHES}, or the sum of the API_ENDPOINTS caps)."
+        ),
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Stay alive and translate SRT paths read from stdin, one per line.",
+    )
+    return parser
+
+
 def main(argv: Sequence[str] | None = None) -> int:
     args = list(argv or sys.argv[1:])
     if not args:
-        print("Usage: python translate_srt.py <input.srt>")
+        print("Usage: python translate_srt.py <input.srt> [--concurrency N] | --worker")
+        return 1
+
+    options = _build_arg_parser().parse_args(args)
+    if options.worker:
+        return run_worker(concurrency=options.concurrency)
+    if not options.input:
+        print("Usage: python translate_srt.py <input.srt> [--concurrency N] | --worker")
         return 1
 
-    input_path = args[0]
     try:
-        output_path = translate_file(input_path)
+        output_path = translate_file(options.input, concurrency=options.concurrency)
     except (OSError, ValueError, TranslationError, requests.RequestException) as exc:
         print(f"[ERROR] {exc}")
         return 1